@@ -3,6 +3,7 @@
 
 from fastapi import Request, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
+from datetime import datetime
 from typing import Callable
 
 from work_time_prediction.core.quota_manager import quota_manager
@@ -32,26 +33,30 @@ class QuotaMiddleware(BaseHTTPMiddleware):
         if self._is_public_endpoint(request.url.path):
             return await call_next(request)
         
-        # Vérifier si l'IP est bannie
-        quota = quota_manager.get_or_create_quota(client_ip)
-        if quota.is_currently_banned:
-            logger.warning(f"Requête bloquée: IP {client_ip} est bannie")
+        # Horloge lue une seule fois par requête
+        now = datetime.utcnow()
+        
+        # Vérifier si l'IP est bannie (statut en cache : pas d'accès base par requête)
+        is_banned, banned_until = quota_manager.get_ban_status(client_ip, now)
+        
+        # Vérifier le rate limiting général (token bucket en mémoire,
+        # le compteur de requêtes est écrit en base périodiquement)
+        is_allowed = not is_banned and quota_manager.check_rate_limit(client_ip, 'request')
+        
+        if is_banned:
+            logger.warning("Requête bloquée: IP %s est bannie", client_ip)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"IP bannie jusqu'à {quota.banned_until}. "
+                detail=f"IP bannie jusqu'à {banned_until}. "
                        f"Raison: Trop de violations des quotas."
             )
         
-        # Vérifier le rate limiting général
-        if not quota_manager.check_rate_limit(client_ip, 'request'):
+        if not is_allowed:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Trop de requêtes. Veuillez réessayer plus tard."
             )
         
-        # Incrémenter le compteur de requêtes
-        quota_manager.increment_counter(client_ip, 'request')
-        
         # Traiter la requête
         response = await call_next(request)
         
@@ -1,12 +1,14 @@
 # src/work_time_prediction/api/predict.py
 # Route de prédiction avec gestion de session
 
-from fastapi import APIRouter, HTTPException, Header, Request
-from datetime import datetime, timedelta
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Header, Request, Response
+from datetime import timedelta
 
 from work_time_prediction.models.predict_request import PredictionRequest
-from work_time_prediction.models.predict_response import PredictionResponse, PredictedDay
-from work_time_prediction.core.predictions import generate_predictions
+from work_time_prediction.models.predict_response import PredictionResponse, dump_predictions
+from work_time_prediction.core.predictions import generate_predictions_batched
 from work_time_prediction.core.exceptions import ModelNotTrainedError, IDNotFoundError
 from work_time_prediction.core.session_manager import session_manager
 from work_time_prediction.core.database import create_security_log
@@ -44,8 +46,11 @@ async def predict_schedule(
     if not session:
         raise HTTPException(status_code=404, detail=ErrorMessages.SESSION_INVALID)
     
-    # Charger le modèle depuis la session (avec cache)
-    model_state = session_manager.load_model(session_id)
+    # Charger le modèle depuis la session (avec cache) ; le chargement disque
+    # peut attendre une écriture en cours : hors de la boucle d'événements
+    model_state = session_manager.get_cached_model(session_id)
+    if model_state is None:
+        model_state = await asyncio.to_thread(session_manager.load_model, session_id)
     if not model_state or not model_state.is_trained:
         raise HTTPException(
             status_code=400,
@@ -53,8 +58,8 @@ async def predict_schedule(
         )
     
     try:
-        # Parser la date cible
-        target_date = datetime.strptime(request.target_date, DATE_FORMAT)
+        # Date cible déjà parsée par PredictionRequest
+        target_date = request.target_date
         
         # Générer la plage de dates
         half_window = request.window_size // 2
@@ -66,41 +71,32 @@ async def predict_schedule(
             for i in range((end_date - start_date).days + 1)
         ]
         
-        # Générer les prédictions (passer le model_state explicitement)
-        predictions_data = generate_predictions(
+        # Générer les prédictions (passer le model_state explicitement) ;
+        # l'appel au modèle est regroupé avec les requêtes simultanées
+        predictions_data = await generate_predictions_batched(
             model_state=model_state,
             session_id=session_id,
             entity_id=request.id,
             dates_to_predict=dates_to_predict
         )
         
-        # Convertir au format de réponse
-        predicted_days = [
-            PredictedDay(
-                date=pred["date"],
-                weekday=pred["weekday"],
-                start_time=pred["start_time"],
-                end_time=pred["end_time"],
-                historical=pred["historical"]
-            )
-            for pred in predictions_data
-        ]
+        # Valider et sérialiser avec l'adaptateur précompilé
+        response_body = dump_predictions(predictions_data)
         
         # Log de sécurité
         create_security_log(
             ip_address=client_ip,
             event_type=SecurityEventType.PREDICTION_MADE,
             session_id=session_id,
-            event_data=f"entity_id={request.id}, date={request.target_date}",
+            event_data=f"entity_id={request.id}, date={target_date.strftime(DATE_FORMAT)}",
             severity=LogSeverity.INFO
         )
 
-        return PredictionResponse(predictions=predicted_days)
-    
-    except ValueError as e:
-        raise HTTPException(
-            status_code=400,
-            detail=ErrorMessages.INVALID_DATE_FORMAT.format(DATE_FORMAT)
+        # Corps JSON construit directement (response_model reste la
+        # documentation OpenAPI, sans revalidation par FastAPI)
+        return Response(
+            content=response_body,
+            media_type="application/json"
         )
     
     except ModelNotTrainedError as e:
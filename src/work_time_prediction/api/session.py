@@ -1,10 +1,17 @@
 # src/work_time_prediction/api/session.py
 # Routes API pour la gestion des sessions
 
-from fastapi import APIRouter, HTTPException, Request, Header, Depends
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Header, Depends, Query
 
 from work_time_prediction.core.session_manager import session_manager
-from work_time_prediction.core.constants import SuccessMessages, ErrorMessages
+from work_time_prediction.core.database import get_security_logs_page
+from work_time_prediction.core.constants import (
+    SuccessMessages, ErrorMessages, SECURITY_LOGS_PAGE_SIZE, SECURITY_LOGS_MAX_PAGE_SIZE
+)
 from work_time_prediction.models.session_create_response import SessionCreateResponse
 from work_time_prediction.models.session_info_response import SessionInfoResponse
 from work_time_prediction.core.security.admin_auth import verify_admin_token
@@ -59,12 +66,9 @@ async def get_session_info(
     if not session:
         raise HTTPException(status_code=404, detail=ErrorMessages.SESSION_NOT_FOUND)
     
-    # Charger le modèle pour vérifier l'état d'entraînement
-    model_state = session_manager.load_model(session_id)
-    
-    is_trained = model_state is not None and model_state.is_trained
-    entity_count = model_state.entity_count if model_state else 0
-    data_row_count = model_state.data_row_count if model_state else 0
+    # État d'entraînement lu depuis les métadonnées (sans charger les modèles) ;
+    # peut attendre une écriture en cours : hors de la boucle d'événements
+    model_summary = await asyncio.to_thread(session_manager.get_model_summary, session_id)
     
     return SessionInfoResponse(
         session_id=session["session_id"],
@@ -72,9 +76,9 @@ async def get_session_info(
         created_at=session["created_at"],
         last_accessed=session["last_accessed"],
         expires_at=session["expires_at"],
-        is_model_trained=is_trained,
-        entity_count=entity_count,
-        data_row_count=data_row_count
+        is_model_trained=model_summary["is_trained"],
+        entity_count=model_summary["entity_count"],
+        data_row_count=model_summary["data_row_count"]
     )
 
 
@@ -89,7 +93,8 @@ async def delete_session(session_id: str = Header(..., alias="X-Session-ID")):
     Returns:
         dict: Message de confirmation
     """
-    deleted = session_manager.delete_session(session_id)
+    # Attend une éventuelle écriture en cours : hors de la boucle d'événements
+    deleted = await asyncio.to_thread(session_manager.delete_session, session_id)
     
     if not deleted:
         raise HTTPException(status_code=404, detail=ErrorMessages.SESSION_NOT_FOUND)
@@ -129,6 +134,44 @@ async def get_cache_info():
     return session_manager.get_cache_info()
 
 
+@router.get("/security-logs", dependencies=[Depends(verify_admin_token)])
+async def get_security_logs(
+    ip_address: str,
+    before_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(SECURITY_LOGS_PAGE_SIZE, ge=1, le=SECURITY_LOGS_MAX_PAGE_SIZE),
+):
+    """
+    Liste les logs de sécurité d'une IP, du plus récent au plus ancien (endpoint admin).
+    Pagination par curseur : repasser next_before_ts et next_before_id
+    pour obtenir la page suivante.
+    Nécessite un token admin dans le header X-Admin-Token.
+    
+    Args:
+        ip_address: Adresse IP
+        before_ts: created_at du dernier log de la page précédente
+        before_id: id du dernier log de la page précédente
+        limit: Nombre maximal de logs
+    
+    Returns:
+        dict: Logs de la page et curseur de la page suivante
+    """
+    if (before_ts is None) != (before_id is None):
+        raise HTTPException(status_code=400, detail="before_ts et before_id doivent être fournis ensemble")
+    
+    logs = await asyncio.to_thread(
+        get_security_logs_page, ip_address, before_ts, before_id, limit
+    )
+    
+    # Page incomplète : plus de logs après celle-ci
+    has_more = len(logs) == limit
+    return {
+        "logs": logs,
+        "next_before_ts": logs[-1]["created_at"] if has_more else None,
+        "next_before_id": logs[-1]["id"] if has_more else None
+    }
+
+
 @router.post("/cache-clear", dependencies=[Depends(verify_admin_token)])
 async def clear_cache():
     """
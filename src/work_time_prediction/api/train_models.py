@@ -49,20 +49,27 @@ async def train_model(
     """
     client_ip = request.client.host if request.client else "unknown"
     
-    # Vérifier le quota d'entraînement spécifique
-    if not quota_manager.check_rate_limit(client_ip, 'train'):
-        logger.warning(f"Quota d'entraînement dépassé pour {client_ip}")
-        raise HTTPException(status_code=429, detail="Quota d'entraînement dépassé")
-    
     # Vérifier la taille du fichier
     contents = await file.read()
     file_size_mb = len(contents) / (1024 * 1024)
+    file_too_large = file_size_mb > quota_manager.quotas_config['max_file_size_mb']
+    
+    # Vérifier les quotas d'entraînement et de stockage dans une seule session
+    with quota_manager.session_scope() as db_session:
+        train_allowed = quota_manager.check_rate_limit(client_ip, 'train', db_session=db_session)
+        # Estimation: CSV * 3 pour modèles
+        storage_allowed = train_allowed and not file_too_large and quota_manager.check_storage_quota(
+            client_ip, file_size_mb * 3, db_session=db_session
+        )
+    
+    if not train_allowed:
+        logger.warning("Quota d'entraînement dépassé pour %s", client_ip)
+        raise HTTPException(status_code=429, detail="Quota d'entraînement dépassé")
     
-    if file_size_mb > quota_manager.quotas_config['max_file_size_mb']:
+    if file_too_large:
         raise HTTPException(status_code=413, detail=f"Fichier trop volumineux (max: {quota_manager.quotas_config['max_file_size_mb']} MB)")
     
-    # Vérifier le quota de stockage (estimation)
-    if not quota_manager.check_storage_quota(client_ip, file_size_mb * 3):  # Estimation: CSV * 3 pour modèles
+    if not storage_allowed:
         raise HTTPException(status_code=507, detail="Quota de stockage dépassé")
     
     # Valider la session
@@ -80,8 +87,8 @@ async def train_model(
         raise HTTPException(status_code=400, detail="Seuls les fichiers CSV sont acceptés")
     
     try:
-        # Lire le contenu du fichier
-        csv_data = io.StringIO(contents.decode('utf-8'))
+        # Contenu brut du fichier : pandas décode l'UTF-8 dans son parseur C
+        csv_data = io.BytesIO(contents)
         
         # Créer le mapping de colonnes (utilisé uniquement pour la transformation)
         columns_mapping = RequiredColumnsMapping(
@@ -95,7 +102,8 @@ async def train_model(
             raise InvalidCsvFormatError("Le fichier CSV ne contient aucune donnée valide après nettoyage")
         
         # Sauvegarder dans la base de données de la session
-        save_data_to_db(df, session_id)
+        # (une seule ligne par id et par date)
+        duplicate_rows = save_data_to_db(df, session_id)
         
         # Entraîner les modèles et obtenir le nouvel état
         model_state = train_models(session_id)
@@ -116,6 +124,7 @@ async def train_model(
             "message": SuccessMessages.MODEL_TRAINED,
             "session_id": session_id,
             "data_points": model_state.data_row_count,
+            "duplicate_rows_ignored": duplicate_rows,
             "entities": model_state.entity_count,
             "trained_at": model_state.trained_at
         }
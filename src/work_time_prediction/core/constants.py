@@ -64,10 +64,14 @@ QUOTAS_DB_PATH = QUOTAS_DIR / "quotas.db"
 
 # Structure: sessions/{session_id}/
 SESSION_METADATA_FILE = "metadata.json"
+SESSION_MODEL_FILE = "model.joblib"  # Modèles + encodeur dans un seul artefact
+SESSION_DATA_DB_FILE = "data.db"
+SESSION_DATA_HASH_FILE = "data.sha256"  # Empreinte du contenu de data.db
+
+# Anciens fichiers séparés (lus uniquement pour les sessions existantes)
 SESSION_MODEL_ARRIVAL_FILE = "model_arrival.pkl"
 SESSION_MODEL_DEPARTURE_FILE = "model_departure.pkl"
 SESSION_ENCODER_FILE = "encoder.pkl"
-SESSION_DATA_DB_FILE = "data.db"
 
 # Alias pour compatibilité avec ancien code
 MODEL_METADATA_FILE = SESSION_METADATA_FILE
@@ -107,6 +111,31 @@ SECURITY_LOGS_TABLE_NAME = "security_logs"
 # Table des données d'horaires (dans data.db de chaque session)
 SCHEDULE_TABLE_NAME = "schedule_data"
 
+# PRAGMAs appliqués à chaque connexion SQLite (journal_mode=WAL est géré à part)
+SQLITE_CONNECTION_PRAGMAS = [
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "temp_store=MEMORY",
+]
+
+# Taille du cache de compilation des requêtes SQLAlchemy (par engine)
+SQLALCHEMY_QUERY_CACHE_SIZE = 1200
+
+# Taille de page (par défaut et maximale) des logs de sécurité d'une IP
+SECURITY_LOGS_PAGE_SIZE = 50
+SECURITY_LOGS_MAX_PAGE_SIZE = 500
+
+# Version du schéma de la base principale (PRAGMA user_version)
+# 1 : horodatages stockés à la seconde (format de CURRENT_TIMESTAMP)
+MAIN_DB_SCHEMA_VERSION = 1
+
+# Version du schéma des bases de session (PRAGMA user_version)
+# 1 : dates de schedule_data au format ISO
+SESSION_DB_SCHEMA_VERSION = 1
+
+# Lignes par executemany lors de l'écriture de schedule_data
+SCHEDULE_INSERT_BATCH_SIZE = 10_000
+
 # ============================================================================
 # NOMS DES VUES SQL
 # ============================================================================
@@ -161,15 +190,44 @@ FEATURES = [
     DFCols.DAY_OF_YEAR
 ]
 
+# Type de la matrice de features passée aux modèles (float32 : type
+# utilisé en interne par les arbres, évite une conversion à chaque appel)
+FEATURES_DTYPE = "float32"
+
 # ============================================================================
 # PARAMÈTRES DES MODÈLES ML
 # ============================================================================
 
+# Type de modèle : "hist_gradient_boosting" (défaut) ou "random_forest"
+ML_MODEL_TYPE_HGB = "hist_gradient_boosting"
+ML_MODEL_TYPE_RANDOM_FOREST = "random_forest"
+ML_MODEL_TYPE = ML_MODEL_TYPE_HGB
+
+# HistGradientBoostingRegressor
+ML_HGB_MAX_ITER = 200
+ML_HGB_MAX_DEPTH = 8
+ML_HGB_LEARNING_RATE = 0.05
+# Arrêt anticipé (10 % des données en validation) à partir de ce nombre de
+# lignes : moins d'itérations, modèle plus petit. En dessous, la validation
+# serait trop petite (voire vide : échec de l'entraînement sur 1 ligne)
+ML_HGB_EARLY_STOPPING_MIN_ROWS = 10_000
+# Features traitées nativement comme catégorielles
+ML_HGB_CATEGORICAL_FEATURES = [DFCols.ID_ENCODED, DFCols.DAY_OF_WEEK, DFCols.MONTH]
+# Nombre maximal de modalités d'une feature catégorielle (max_bins)
+ML_HGB_MAX_CATEGORIES = 255
+
 # RandomForestRegressor
 ML_N_ESTIMATORS = 100
 ML_RANDOM_STATE = 42
 ML_N_JOBS = -1
+# En dessous de ce nombre de lignes, entraînement sur un seul cœur :
+# la répartition des arbres entre threads coûte plus qu'elle ne rapporte
+ML_PARALLEL_MIN_ROWS = 50_000
 ML_MAX_DEPTH = 10
+ML_MAX_FEATURES = "sqrt"
+ML_MIN_SAMPLES_LEAF = 5
+# min_samples_leaf effectif = max(ML_MIN_SAMPLES_LEAF, lignes // ML_MIN_SAMPLES_LEAF_ROWS_DIVISOR)
+ML_MIN_SAMPLES_LEAF_ROWS_DIVISOR = 10_000
 
 # Seuil de confiance pour les prédictions (en minutes)
 # Si l'erreur estimée dépasse ce seuil, on retourne NA au lieu d'une prédiction douteuse
@@ -195,6 +253,8 @@ DEFAULT_QUOTAS = {
     # Bannissement
     "ban_after_violations": 10,
     "ban_duration_hours": 24,
+    # Durée de validité (secondes) du statut de bannissement gardé en mémoire
+    "ban_status_cache_seconds": 30,
 }
 
 # ============================================================================
@@ -203,10 +263,17 @@ DEFAULT_QUOTAS = {
 
 # Taille des tokens de session (en bytes avant hex encoding)
 SESSION_TOKEN_BYTES = 32  # 64 caractères hex
+SESSION_ID_LENGTH = SESSION_TOKEN_BYTES * 2
+
+# Longueur maximale d'une adresse IP textuelle (IPv6 avec IPv4 embarquée)
+IP_ADDRESS_MAX_LENGTH = 45
 
 # Expiration des sessions
 JWT_EXPIRATION_DAYS = 365  # 1 an
 
+# Intervalle minimal entre deux écritures de last_accessed (évite un UPDATE par requête)
+SESSION_LAST_ACCESSED_UPDATE_SECONDS = 60
+
 # Taille minimale de la clé secrète (si JWT utilisé)
 MIN_JWT_SECRET_LENGTH = 32
 
@@ -219,6 +286,7 @@ CLEANUP_CONFIG = {
     "log_retention_days": 30,         # Garder les logs 30 jours
     "cleanup_interval_hours": 24,      # Lancer cleanup toutes les 24 heures
     "max_security_logs": 100000,       # Nombre max de logs avant auto-nettoyage
+    "delete_batch_size": 1000,         # Lignes supprimées par transaction
 }
 
 # ============================================================================
@@ -233,7 +301,10 @@ DATE_FORMATS = [
 
 # Format par défaut pour l'affichage
 DATE_FORMAT = "%d/%m/%Y"
+# Format de stockage des dates dans schedule_data (ISO : tri et plages corrects)
+DB_DATE_FORMAT = "%Y-%m-%d"
 TIME_FORMAT = "%H:%M"
+MINUTES_PER_DAY = 1440  # Heures stockées en minutes depuis minuit : 0..1439
 DATETIME_FORMAT = "%d/%m/%Y %H:%M:%S"
 ISO_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
@@ -257,9 +328,13 @@ NA_VALUE = "NA"
 # Nombre maximum de modèles en cache mémoire (LRU)
 MAX_MODELS_IN_CACHE = 50
 
-# Durée de vie du cache en secondes
+# Durée d'inactivité (secondes) avant libération d'un modèle en cache
 CACHE_TTL_SECONDS = 3600  # 1 heure
 
+# Regroupement des prédictions simultanées sur une même session
+PREDICTION_BATCH_MAX_REQUESTS = 64
+PREDICTION_BATCH_WAIT_SECONDS = 0.005  # 5 ms
+
 # ============================================================================
 # SÉPARATEURS CSV
 # ============================================================================
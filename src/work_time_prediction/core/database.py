@@ -1,46 +1,200 @@
 # src/work_time_prediction/core/database.py
 # Gestion de la base de données avec SQLAlchemy
 
+import hashlib
+import orjson
 import pandas as pd
 import io
+import threading
+from dataclasses import astuple
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker, Session as SQLSession
+from sqlalchemy import bindparam, create_engine, delete, event, select, text, update
+from sqlalchemy.orm import Session as SQLSession
 from sqlalchemy.exc import OperationalError
+from cachetools import LRUCache
 
 from work_time_prediction.models.database import Base, Session, IPQuota, SecurityLog, ScheduleData
 from work_time_prediction.core.constants import (
     SESSIONS_DB_PATH, SCHEDULE_TABLE_NAME, DF_COLS, DFCols,
-    CSV_SEPARATORS, DATE_FORMATS, DATE_FORMAT, ErrorMessages
+    CSV_SEPARATORS, DATE_FORMATS, DB_DATE_FORMAT, ErrorMessages,
+    SQLITE_CONNECTION_PRAGMAS, MAX_MODELS_IN_CACHE, CLEANUP_CONFIG, MINUTES_PER_DAY,
+    SCHEDULE_INSERT_BATCH_SIZE, SQLALCHEMY_QUERY_CACHE_SIZE, SESSION_DB_SCHEMA_VERSION,
+    MAIN_DB_SCHEMA_VERSION, SECURITY_LOGS_PAGE_SIZE
 )
-from work_time_prediction.core.utils.time_converter import time_to_minutes
+from work_time_prediction.core.utils.time_converter import times_to_minutes
 from work_time_prediction.core.exceptions import InvalidCsvFormatError
 from work_time_prediction.core.required_columns import RequiredColumnsMapping
+from work_time_prediction.core.utils.folder_manager import (
+    get_session_data_db_path, get_session_data_hash_path, get_session_dir
+)
+from work_time_prediction.core.utils.temporal_features import get_temporal_features
+from work_time_prediction.core.utils.logging_config import get_logger
 
+logger = get_logger()
 
 # ============================================================================
 # GESTION DES ENGINES ET SESSIONS
 # ============================================================================
 
+# Fichiers SQLite déjà passés en mode WAL (le mode est persistant par fichier)
+_wal_enabled_paths: set[str] = set()
+
+
+def _create_sqlite_engine(db_path: Path):
+    """
+    Crée un engine SQLite configuré pour de meilleures performances.
+    
+    Chaque nouvelle connexion active le journal WAL (une seule fois par fichier)
+    et applique les PRAGMAs de SQLITE_CONNECTION_PRAGMAS (synchronous, busy_timeout...).
+    
+    Args:
+        db_path: Chemin du fichier SQLite
+    
+    Returns:
+        SQLAlchemy engine
+    """
+    engine = create_engine(
+        f'sqlite:///{db_path}',
+        echo=False,
+        query_cache_size=SQLALCHEMY_QUERY_CACHE_SIZE
+    )
+    path_key = str(db_path)
+    
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if path_key not in _wal_enabled_paths:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                _wal_enabled_paths.add(path_key)
+            for pragma in SQLITE_CONNECTION_PRAGMAS:
+                cursor.execute(f"PRAGMA {pragma}")
+        finally:
+            cursor.close()
+    
+    return engine
+
+
+class _EngineCache(LRUCache):
+    """Cache LRU d'engines qui libère les connexions des engines évincés."""
+    
+    def popitem(self):
+        key, engine = super().popitem()
+        engine.dispose()
+        return key, engine
+
+
+# Engines réutilisés entre les appels (chaque engine garde son pool de connexions)
+_main_engine = None
+_session_data_engines: _EngineCache = _EngineCache(maxsize=MAX_MODELS_IN_CACHE)
+_engines_lock = threading.Lock()
+
+
 def get_main_engine():
-    """Retourne l'engine pour la base de données principale (sessions.db)."""
-    # Créer le répertoire si nécessaire
-    SESSIONS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    return create_engine(f'sqlite:///{SESSIONS_DB_PATH}', echo=False)
+    """Retourne l'engine (partagé) pour la base de données principale (sessions.db)."""
+    global _main_engine
+    
+    if _main_engine is None:
+        with _engines_lock:
+            if _main_engine is None:
+                # Créer le répertoire si nécessaire
+                SESSIONS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+                _main_engine = _create_sqlite_engine(SESSIONS_DB_PATH)
+    
+    return _main_engine
 
 
 def get_session_data_engine(session_id: str):
-    """Retourne l'engine pour la base de données d'une session spécifique."""
-    from work_time_prediction.core.utils.folder_manager import get_session_data_db_path
-    db_path = get_session_data_db_path(session_id)
-    return create_engine(f'sqlite:///{db_path}', echo=False)
+    """Retourne l'engine (mis en cache) pour la base de données d'une session spécifique."""
+    with _engines_lock:
+        engine = _session_data_engines.get(session_id)
+        
+        is_new_engine = engine is None
+        if is_new_engine:
+            db_path = get_session_data_db_path(session_id)
+            engine = _create_sqlite_engine(db_path)
+            _session_data_engines[session_id] = engine
+    
+    if is_new_engine:
+        _migrate_schedule_dates_to_iso(engine)
+    
+    return engine
 
 
-def get_db_session(engine) -> SQLSession:
-    """Crée et retourne une session SQLAlchemy."""
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+def _migrate_schedule_dates_to_iso(engine):
+    """
+    Convertit les dates jj/mm/aaaa des anciennes bases de session au
+    format ISO (aaaa-mm-jj), seul format comparable par plage.
+    
+    La conversion n'a lieu qu'une fois par fichier : PRAGMA user_version
+    est porté à SESSION_DB_SCHEMA_VERSION ensuite, et les ouvertures
+    suivantes (ex: engine recréé après éviction) ne font qu'une lecture.
+    
+    Args:
+        engine: SQLAlchemy engine pour la base de données de session
+    """
+    try:
+        with engine.begin() as conn:
+            version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+            if version >= SESSION_DB_SCHEMA_VERSION:
+                return
+            
+            conn.execute(text(
+                "UPDATE schedule_data "
+                "SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2) "
+                "WHERE date LIKE '__/__/____'"
+            ))
+            conn.exec_driver_sql(f"PRAGMA user_version = {SESSION_DB_SCHEMA_VERSION}")
+    except OperationalError:
+        # Base ou table pas encore créée : rien à convertir
+        pass
+
+
+def dispose_session_data_engine(session_id: str):
+    """
+    Ferme les connexions de la base de données d'une session et retire son engine du cache.
+    À appeler avant de supprimer le répertoire de la session : le fichier est
+    aussi oublié de _wal_enabled_paths, un nouveau fichier au même chemin
+    recevra donc à nouveau le mode WAL.
+    
+    Args:
+        session_id: ID de la session
+    """
+    with _engines_lock:
+        engine = _session_data_engines.pop(session_id, None)
+        _wal_enabled_paths.discard(str(get_session_data_db_path(session_id)))
+    
+    if engine is not None:
+        engine.dispose()
+
+
+def dispose_engines():
+    """Ferme toutes les connexions ouvertes (à l'arrêt de l'application)."""
+    global _main_engine
+    
+    with _engines_lock:
+        engines = list(_session_data_engines.values())
+        _session_data_engines.clear()
+        if _main_engine is not None:
+            engines.append(_main_engine)
+            _main_engine = None
+    
+    for engine in engines:
+        engine.dispose()
+
+
+def get_db_session(engine, expire_on_commit: bool = True) -> SQLSession:
+    """
+    Crée et retourne une session SQLAlchemy.
+    
+    Args:
+        engine: SQLAlchemy engine
+        expire_on_commit: Expirer les objets après commit (désactiver si les
+            objets sont lus après fermeture de la session)
+    """
+    return SQLSession(bind=engine, expire_on_commit=expire_on_commit)
 
 
 def init_main_database():
@@ -50,6 +204,12 @@ def init_main_database():
     # Créer toutes les tables avec SQLAlchemy
     Base.metadata.create_all(engine)
     
+    # Convertir les anciennes dates d'expiration ISO en entiers
+    _migrate_expires_at_to_epoch(engine)
+    
+    # Tronquer les anciens horodatages à la seconde
+    _migrate_timestamps_to_seconds(engine)
+    
     # Créer les index supplémentaires non définis dans les modèles
     _create_additional_indexes(engine)
     
@@ -62,7 +222,6 @@ def init_session_database(session_id: str):
     engine = get_session_data_engine(session_id)
     
     # Créer le répertoire si nécessaire
-    from work_time_prediction.core.utils.folder_manager import get_session_dir
     get_session_dir(session_id).mkdir(parents=True, exist_ok=True)
     
     # Créer la table schedule_data avec SQLAlchemy
@@ -70,6 +229,10 @@ def init_session_database(session_id: str):
     
     # Créer les index pour schedule_data
     _create_session_data_indexes(engine)
+    
+    # Nouvelle base : déjà au format courant (aucune migration à prévoir)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SESSION_DB_SCHEMA_VERSION}")
 
 
 def _create_session_data_indexes(engine):
@@ -79,17 +242,16 @@ def _create_session_data_indexes(engine):
     Args:
         engine: SQLAlchemy engine pour la base de données de session
     """
-    from sqlalchemy import text
-    
     indexes_sql = [
-        # Index sur la colonne id pour rechercher par entité
-        "CREATE INDEX IF NOT EXISTS idx_schedule_data_id ON schedule_data(id)",
-        
-        # Index sur la colonne date pour rechercher par date
-        "CREATE INDEX IF NOT EXISTS idx_schedule_data_date ON schedule_data(date)",
+        # Anciens index redondants avec le préfixe de l'index couvrant
+        "DROP INDEX IF EXISTS idx_schedule_data_id",
+        "DROP INDEX IF EXISTS idx_schedule_data_date",
+        "DROP INDEX IF EXISTS idx_schedule_data_id_date",
         
-        # Index composite pour les requêtes fréquentes (entité + date)
-        "CREATE INDEX IF NOT EXISTS idx_schedule_data_id_date ON schedule_data(id, date)",
+        # Index couvrant (entité + date + horaires) : lecture de
+        # l'historique d'une entité sans accès à la table
+        "CREATE INDEX IF NOT EXISTS idx_schedule_data_id_date_covering "
+        "ON schedule_data(id, date, start_time_by_minutes, end_time_by_minutes)",
     ]
     
     with engine.begin() as conn:
@@ -103,12 +265,21 @@ def _create_session_data_indexes(engine):
 
 def _create_additional_indexes(engine):
     """Crée les index supplémentaires avec SQLAlchemy."""
-    from sqlalchemy import text
-    
     indexes_sql = [
+        # Index mono-colonne redondants avec le préfixe des index composites
+        "DROP INDEX IF EXISTS ix_sessions_ip_address",
+        "DROP INDEX IF EXISTS ix_security_logs_ip_address",
+        
+        # Anciens index remplacés par idx_security_logs_ip_created_id_desc
+        "DROP INDEX IF EXISTS idx_security_logs_ip_date",
+        "DROP INDEX IF EXISTS idx_security_logs_ip_created_desc",
+        
+        # Index complets remplacés par idx_ip_quotas_banned_until_partial
+        "DROP INDEX IF EXISTS ix_ip_quotas_is_banned",
+        "DROP INDEX IF EXISTS ix_ip_quotas_banned_until",
+        
         # Index composites non définis dans les modèles
         "CREATE INDEX IF NOT EXISTS idx_sessions_ip_expires ON sessions(ip_address, expires_at)",
-        "CREATE INDEX IF NOT EXISTS idx_security_logs_ip_date ON security_logs(ip_address, created_at DESC)",
     ]
     
     with engine.begin() as conn:
@@ -120,10 +291,61 @@ def _create_additional_indexes(engine):
                 pass
 
 
+def _migrate_expires_at_to_epoch(engine):
+    """
+    Convertit les expires_at stockés en chaîne ISO (ancien schéma) en
+    secondes depuis l'epoch, et supprime les vues qui comparaient des dates
+    texte pour qu'elles soient recréées.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE sessions "
+            "SET expires_at = CAST(strftime('%s', expires_at) AS INTEGER) "
+            "WHERE typeof(expires_at) = 'text'"
+        ))
+        
+        stale_views = conn.execute(text(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'view' AND sql LIKE '%expires_at%datetime(''now'')%'"
+        )).scalars().all()
+        for view_name in stale_views:
+            conn.execute(text(f'DROP VIEW IF EXISTS "{view_name}"'))
+
+
+def _migrate_timestamps_to_seconds(engine):
+    """
+    Tronque à la seconde les horodatages écrits avec microsecondes par
+    l'ancien schéma : toutes les valeurs ont alors le format de
+    CURRENT_TIMESTAMP et se comparent lexicalement.
+    
+    La conversion n'a lieu qu'une fois : PRAGMA user_version est porté à
+    MAIN_DB_SCHEMA_VERSION ensuite.
+    """
+    timestamp_columns = [
+        ("sessions", "created_at"),
+        ("sessions", "last_accessed"),
+        ("ip_quotas", "banned_until"),
+        ("ip_quotas", "last_reset"),
+        ("ip_quotas", "created_at"),
+        ("security_logs", "created_at"),
+    ]
+    
+    with engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version >= MAIN_DB_SCHEMA_VERSION:
+            return
+        
+        for table_name, column_name in timestamp_columns:
+            conn.execute(text(
+                f"UPDATE {table_name} "
+                f"SET {column_name} = substr({column_name}, 1, 19) "
+                f"WHERE length({column_name}) > 19"
+            ))
+        conn.exec_driver_sql(f"PRAGMA user_version = {MAIN_DB_SCHEMA_VERSION}")
+
+
 def _create_views(engine):
     """Crée les vues SQL avec SQLAlchemy."""
-    from sqlalchemy import text
-    
     views_sql = [
         # Vue des sessions actives
         """
@@ -133,10 +355,10 @@ def _create_views(engine):
             ip_address,
             created_at,
             last_accessed,
-            expires_at,
+            datetime(expires_at, 'unixepoch') AS expires_at,
             session_metadata
         FROM sessions
-        WHERE expires_at > datetime('now')
+        WHERE expires_at > CAST(strftime('%s', 'now') AS INTEGER)
         ORDER BY last_accessed DESC
         """,
         
@@ -148,10 +370,10 @@ def _create_views(engine):
             ip_address,
             created_at,
             last_accessed,
-            expires_at
+            datetime(expires_at, 'unixepoch') AS expires_at
         FROM sessions
-        WHERE expires_at <= datetime('now')
-        ORDER BY expires_at DESC
+        WHERE expires_at <= CAST(strftime('%s', 'now') AS INTEGER)
+        ORDER BY sessions.expires_at DESC
         """,
         
         # Vue des statistiques par IP
@@ -160,8 +382,8 @@ def _create_views(engine):
         SELECT 
             s.ip_address,
             COUNT(s.session_id) as total_sessions,
-            COUNT(CASE WHEN s.expires_at > datetime('now') THEN 1 END) as active_sessions,
-            COUNT(CASE WHEN s.expires_at <= datetime('now') THEN 1 END) as expired_sessions,
+            COUNT(CASE WHEN s.expires_at > CAST(strftime('%s', 'now') AS INTEGER) THEN 1 END) as active_sessions,
+            COUNT(CASE WHEN s.expires_at <= CAST(strftime('%s', 'now') AS INTEGER) THEN 1 END) as expired_sessions,
             MIN(s.created_at) as first_session_date,
             MAX(s.last_accessed) as last_activity_date
         FROM sessions s
@@ -183,14 +405,18 @@ def _create_views(engine):
 # ============================================================================
 
 def load_data_from_csv(
-    csv_data: io.StringIO, 
+    csv_data: io.BytesIO, 
     required_columns: RequiredColumnsMapping
 ) -> pd.DataFrame:
     """
     Charge le CSV et effectue le prétraitement initial.
     
+    Les lignes sans date ou ID, avec une heure nulle, une fin avant le début
+    ou une heure de fin au-delà de 23:59 sont ignorées (ces dernières sont
+    comptées dans un avertissement du log).
+    
     Args:
-        csv_data: Contenu du CSV
+        csv_data: Contenu brut du CSV (UTF-8)
         required_columns: Mapping des colonnes CSV vers colonnes standardisées
     
     Returns:
@@ -205,7 +431,7 @@ def load_data_from_csv(
         for separator in CSV_SEPARATORS:
             try:
                 csv_data.seek(0)
-                df = pd.read_csv(csv_data, sep=separator)
+                df = pd.read_csv(csv_data, sep=separator, encoding='utf-8')
                 if len(df.columns) >= len(DF_COLS):
                     break
             except Exception:
@@ -221,7 +447,7 @@ def load_data_from_csv(
         required_columns_clean = required_columns.clean()
         
         # Vérification des colonnes requises
-        required_fields = vars(required_columns_clean).values()
+        required_fields = astuple(required_columns_clean)
         missing_cols = [col for col in required_fields if col not in df.columns]
         
         if missing_cols:
@@ -231,8 +457,8 @@ def load_data_from_csv(
         
         # Conversion vers colonnes standardisées
         df[DFCols.ID] = df[required_columns_clean.id].astype(str)
-        df[DFCols.START_TIME_BY_MINUTES] = df[required_columns_clean.start_time].apply(time_to_minutes)
-        df[DFCols.END_TIME_BY_MINUTES] = df[required_columns_clean.end_time].apply(time_to_minutes)
+        df[DFCols.START_TIME_BY_MINUTES] = times_to_minutes(df[required_columns_clean.start_time])
+        df[DFCols.END_TIME_BY_MINUTES] = times_to_minutes(df[required_columns_clean.end_time])
         
         # Parser les dates avec plusieurs formats
         date_column = df[required_columns_clean.date]
@@ -260,6 +486,14 @@ def load_data_from_csv(
             (df[DFCols.END_TIME_BY_MINUTES] > 0)
         ]
         df = df[df[DFCols.END_TIME_BY_MINUTES] > df[DFCols.START_TIME_BY_MINUTES]]
+        # Heures hors d'une journée (ex: 25:00) : rejetées par ck_*_range
+        out_of_day = df[DFCols.END_TIME_BY_MINUTES] >= MINUTES_PER_DAY
+        if out_of_day.any():
+            logger.warning(
+                "%d ligne(s) ignorée(s) : heure de fin au-delà de 23:59",
+                int(out_of_day.sum())
+            )
+            df = df[~out_of_day]
         
         if df.empty:
             raise InvalidCsvFormatError(
@@ -278,35 +512,104 @@ def load_data_from_csv(
 # OPÉRATIONS SUR LES DONNÉES D'ENTRAÎNEMENT
 # ============================================================================
 
-def save_data_to_db(df: pd.DataFrame, session_id: str):
+def _hash_schedule_data(df: pd.DataFrame) -> str:
+    """
+    Calcule l'empreinte SHA-256 du contenu d'un DataFrame d'horaires.
+    
+    Args:
+        df: DataFrame prêt à être écrit (dates en string ISO)
+    
+    Returns:
+        Empreinte hexadécimale
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    return hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+
+
+_INSERT_SCHEDULE_ROW_SQL = (
+    f"INSERT INTO {SCHEDULE_TABLE_NAME} "
+    f"({DFCols.ID}, {DFCols.DATE}, {DFCols.START_TIME_BY_MINUTES}, {DFCols.END_TIME_BY_MINUTES}) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+
+def save_data_to_db(df: pd.DataFrame, session_id: str) -> int:
     """
     Sauvegarde le DataFrame dans la base de données de la session.
     
+    Une seule ligne est conservée par (id, date) : la dernière du CSV.
+    L'écriture est ignorée si les données sont identiques à celles déjà
+    enregistrées (même empreinte).
+    
     Args:
         df: DataFrame avec colonnes standardisées
         session_id: ID de la session
+    
+    Returns:
+        Nombre de lignes en double (même id et même date) ignorées
     """
     engine = get_session_data_engine(session_id)
     
-    # Convertir les dates en string pour SQLite
+    # Convertir les dates en string ISO (format de la colonne Date pour SQLite)
     df_copy = df.copy()
-    df_copy[DFCols.DATE] = df_copy[DFCols.DATE].dt.strftime(DATE_FORMAT)
-    
-    # Sauvegarder avec pandas (plus simple pour bulk insert)
-    df_copy.to_sql(
-        SCHEDULE_TABLE_NAME, 
-        engine, 
-        if_exists='replace', 
-        index=False
-    )
+    df_copy[DFCols.DATE] = df_copy[DFCols.DATE].dt.strftime(DB_DATE_FORMAT)
+    
+    # Une seule ligne par (id, date) : contrainte uq_schedule_data_id_date
+    df_copy = df_copy.drop_duplicates(subset=[DFCols.ID, DFCols.DATE], keep='last')
+    duplicate_count = len(df) - len(df_copy)
+    if duplicate_count:
+        logger.warning(
+            "Session %s : %d ligne(s) en double (même id et même date) ignorée(s)",
+            session_id, duplicate_count
+        )
+    
+    # Comparer avec l'empreinte des données déjà enregistrées
+    data_hash = _hash_schedule_data(df_copy)
+    hash_path = get_session_data_hash_path(session_id)
+    try:
+        if hash_path.read_text() == data_hash:
+            return duplicate_count
+    except OSError:
+        pass
+    
+    # Invalider l'empreinte avant l'écriture : jamais d'empreinte
+    # correspondant à d'autres données que celles de la table
+    hash_path.unlink(missing_ok=True)
+    
+    # Vider puis remplir la table dans une seule transaction, sans la supprimer :
+    # le schéma (clés, contraintes, index) créé par init_session_database est conservé
+    with engine.begin() as conn:
+        ScheduleData.__table__.create(conn, checkfirst=True)
+        conn.execute(delete(ScheduleData))
+        
+        # Insertion en masse : executemany sqlite3 sur des tuples, par lots
+        # (ni objets ORM ni dictionnaires par ligne)
+        rows = list(zip(
+            df_copy[DFCols.ID].astype(str).tolist(),
+            df_copy[DFCols.DATE].tolist(),
+            df_copy[DFCols.START_TIME_BY_MINUTES].astype('int64').tolist(),
+            df_copy[DFCols.END_TIME_BY_MINUTES].astype('int64').tolist()
+        ))
+        for start in range(0, len(rows), SCHEDULE_INSERT_BATCH_SIZE):
+            conn.exec_driver_sql(
+                _INSERT_SCHEDULE_ROW_SQL,
+                rows[start:start + SCHEDULE_INSERT_BATCH_SIZE]
+            )
+    
+    hash_path.write_text(data_hash)
+    return duplicate_count
 
 
-def get_all_data(session_id: str) -> pd.DataFrame:
+def _read_schedule_data(session_id: str, entity_id: Optional[str] = None) -> pd.DataFrame:
     """
-    Récupère toutes les données d'une session avec features temporelles.
+    Lit les données d'horaires d'une session et ajoute les features temporelles.
+    
+    Seules les colonnes utiles (DF_COLS) sont lues et le filtre éventuel
+    sur l'entité est appliqué par SQLite (index couvrant idx_schedule_data_id_date_covering).
     
     Args:
         session_id: ID de la session
+        entity_id: ID de l'entité à filtrer (toutes les entités si None)
     
     Returns:
         DataFrame avec colonnes enrichies (features temporelles)
@@ -315,24 +618,19 @@ def get_all_data(session_id: str) -> pd.DataFrame:
     
     try:
         # Lire depuis la base de données
-        query = f"SELECT * FROM {SCHEDULE_TABLE_NAME}"
+        query = select(*(ScheduleData.__table__.c[col] for col in DF_COLS))
+        if entity_id is not None:
+            query = query.where(ScheduleData.id == entity_id)
         df = pd.read_sql_query(query, engine)
         
         if df.empty:
             return pd.DataFrame()
         
         # Convertir la colonne date
-        df[DFCols.DATE] = pd.to_datetime(df[DFCols.DATE], format=DATE_FORMAT)
+        df[DFCols.DATE] = pd.to_datetime(df[DFCols.DATE], format=DB_DATE_FORMAT)
         
         # Ajouter les features temporelles
-        df[DFCols.DAY_OF_YEAR] = df[DFCols.DATE].dt.dayofyear
-        df[DFCols.DAY_OF_WEEK] = df[DFCols.DATE].dt.dayofweek
-        df[DFCols.WEEK_OF_YEAR] = df[DFCols.DATE].dt.isocalendar().week
-        df[DFCols.MONTH] = df[DFCols.DATE].dt.month
-        
-        # Calculer week_of_month
-        from work_time_prediction.core.utils.temporal_features import get_week_of_month
-        df[DFCols.WEEK_OF_MONTH] = df[DFCols.DATE].apply(get_week_of_month)
+        df = pd.concat([df, get_temporal_features(df[DFCols.DATE])], axis=1)
         
         return df
     
@@ -341,6 +639,19 @@ def get_all_data(session_id: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def get_all_data(session_id: str) -> pd.DataFrame:
+    """
+    Récupère toutes les données d'une session avec features temporelles.
+    
+    Args:
+        session_id: ID de la session
+    
+    Returns:
+        DataFrame avec colonnes enrichies (features temporelles)
+    """
+    return _read_schedule_data(session_id)
+
+
 def get_entity_history(session_id: str, entity_id: str) -> pd.DataFrame:
     """
     Récupère l'historique d'une entité spécifique.
@@ -352,17 +663,26 @@ def get_entity_history(session_id: str, entity_id: str) -> pd.DataFrame:
     Returns:
         DataFrame filtré pour cet entité
     """
-    df = get_all_data(session_id)
-    if df.empty:
-        return df
-    
-    return df[df[DFCols.ID] == entity_id]
+    return _read_schedule_data(session_id, entity_id)
 
 
 # ============================================================================
 # OPÉRATIONS SUR LES SESSIONS (SQLAlchemy ORM)
 # ============================================================================
 
+# Requêtes fréquentes construites une seule fois (paramètres liés) :
+# la forme compilée est réutilisée par SQLAlchemy et le statement
+# préparé reste dans le cache sqlite3 de chaque connexion
+_SELECT_SESSION_BY_ID = select(Session).where(
+    Session.session_id == bindparam('target_session_id')
+)
+_UPDATE_SESSION_LAST_ACCESSED = (
+    update(Session)
+    .where(Session.session_id == bindparam('target_session_id'))
+    .values(last_accessed=bindparam('accessed_at'))
+)
+
+
 def create_session_record(
     session_id: str,
     ip_address: str,
@@ -389,7 +709,7 @@ def create_session_record(
             session_id=session_id,
             ip_address=ip_address,
             expires_at=expires_at,
-            session_metadata=str(metadata or {})
+            session_metadata=orjson.dumps(metadata or {}).decode()
         )
         
         db_session.add(session_record)
@@ -416,66 +736,145 @@ def get_session_record(session_id: str) -> Optional[Session]:
     db_session = get_db_session(engine)
     
     try:
-        stmt = select(Session).where(Session.session_id == session_id)
-        result = db_session.execute(stmt).scalar_one_or_none()
+        result = db_session.execute(
+            _SELECT_SESSION_BY_ID, {'target_session_id': session_id}
+        ).scalar_one_or_none()
         return result
     
     finally:
         db_session.close()
 
 
-def delete_session_record(session_id: str) -> bool:
+def delete_session_record(session_id: str) -> Optional[str]:
     """
-    Supprime un enregistrement de session.
+    Supprime un enregistrement de session (lecture et suppression dans la même transaction).
     
     Args:
         session_id: ID de la session
     
     Returns:
-        True si supprimé, False si non trouvé
+        Adresse IP de la session supprimée, None si non trouvée
     """
     engine = get_main_engine()
     db_session = get_db_session(engine)
     
     try:
-        session_record = db_session.query(Session).filter(
-            Session.session_id == session_id
-        ).first()
+        session_record = db_session.get(Session, session_id)
         
-        if session_record:
-            db_session.delete(session_record)
-            db_session.commit()
-            return True
+        if not session_record:
+            return None
+        
+        # Colonne déclarée sans Mapped[] : typée Column[str] pour mypy
+        ip_address = str(session_record.ip_address)
         
-        return False
+        # Logs supprimés en une requête (la relation n'est pas chargée)
+        db_session.execute(
+            delete(SecurityLog).where(SecurityLog.session_id == session_id)
+        )
+        db_session.delete(session_record)
+        db_session.commit()
+        
+        return ip_address
     
     finally:
         db_session.close()
 
 
-def update_session_last_accessed(session_id: str):
+def delete_expired_session_records(now) -> list[str]:
     """
-    Met à jour le timestamp de dernier accès d'une session.
+    Supprime toutes les sessions expirées ainsi que leurs logs de sécurité,
+    par lots de taille bornée (une transaction courte par lot).
     
     Args:
-        session_id: ID de la session
-    """
-    from datetime import datetime
+        now: Date de référence (sessions avec expires_at <= now)
     
+    Returns:
+        Liste des session_id supprimés
+    """
     engine = get_main_engine()
-    db_session = get_db_session(engine)
+    batch_size = CLEANUP_CONFIG["delete_batch_size"]
+    deleted_ids: list[str] = []
     
-    try:
-        session_record = db_session.query(Session).filter(
-            Session.session_id == session_id
-        ).first()
+    while True:
+        db_session = get_db_session(engine)
         
-        if session_record:
-            session_record.last_accessed = datetime.utcnow()
+        try:
+            # Lot suivant (index sur expires_at)
+            batch_ids = db_session.execute(
+                select(Session.session_id)
+                .where(Session.expires_at <= now)
+                .limit(batch_size)
+            ).scalars().all()
+            
+            if not batch_ids:
+                return deleted_ids
+            
+            # Équivalent en masse de la cascade ORM Session -> SecurityLog
+            db_session.execute(
+                delete(SecurityLog).where(SecurityLog.session_id.in_(batch_ids))
+            )
+            db_session.execute(
+                delete(Session).where(Session.session_id.in_(batch_ids))
+            )
             db_session.commit()
+            
+            deleted_ids.extend(batch_ids)
+        
+        finally:
+            db_session.close()
+
+
+def delete_old_security_logs(before: datetime) -> int:
+    """
+    Supprime les logs de sécurité antérieurs à une date, par lots de
+    taille bornée (évite une transaction géante et la croissance du WAL).
     
-    finally:
-        db_session.close()
+    Args:
+        before: Date limite (logs avec created_at < before)
+    
+    Returns:
+        Nombre de logs supprimés
+    """
+    engine = get_main_engine()
+    batch_size = CLEANUP_CONFIG["delete_batch_size"]
+    total_deleted = 0
+    
+    while True:
+        with engine.begin() as conn:
+            result = conn.execute(
+                delete(SecurityLog).where(
+                    SecurityLog.id.in_(
+                        select(SecurityLog.id)
+                        .where(SecurityLog.created_at < before)
+                        .limit(batch_size)
+                    )
+                )
+            )
+        
+        if not result.rowcount:
+            return total_deleted
+        
+        total_deleted += result.rowcount
+
+
+def update_session_last_accessed(session_id: str, accessed_at: Optional[datetime] = None):
+    """
+    Met à jour le timestamp de dernier accès d'une session (un seul UPDATE).
+    
+    Args:
+        session_id: ID de la session
+        accessed_at: Date du dernier accès (par défaut: maintenant)
+    """
+    engine = get_main_engine()
+    
+    with engine.begin() as conn:
+        conn.execute(
+            _UPDATE_SESSION_LAST_ACCESSED,
+            {
+                'target_session_id': session_id,
+                'accessed_at': accessed_at or datetime.utcnow()
+            }
+        )
 
 
 # ============================================================================
@@ -496,9 +895,8 @@ def get_or_create_ip_quota(ip_address: str) -> IPQuota:
     db_session = get_db_session(engine)
     
     try:
-        quota = db_session.query(IPQuota).filter(
-            IPQuota.ip_address == ip_address
-        ).first()
+        # Recherche par clé primaire (requête compilée mise en cache)
+        quota = db_session.get(IPQuota, ip_address)
         
         if not quota:
             quota = IPQuota(ip_address=ip_address)
@@ -548,5 +946,47 @@ def create_security_log(
         db_session.add(log)
         db_session.commit()
     
+    finally:
+        db_session.close()
+
+
+def get_security_logs_page(
+    ip_address: str,
+    before_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = SECURITY_LOGS_PAGE_SIZE
+) -> list[dict]:
+    """
+    Récupère une page de logs de sécurité d'une IP, du plus récent au plus ancien.
+    
+    Args:
+        ip_address: Adresse IP
+        before_ts: created_at du dernier log de la page précédente (None: première page)
+        before_id: id du dernier log de la page précédente
+        limit: Nombre maximal de logs
+    
+    Returns:
+        Liste de logs (dictionnaires)
+    """
+    engine = get_main_engine()
+    db_session = get_db_session(engine)
+    
+    try:
+        logs = SecurityLog.page_for_ip(
+            db_session, ip_address, before_ts=before_ts, before_id=before_id, limit=limit
+        )
+        
+        return [
+            {
+                "id": log.id,
+                "session_id": log.session_id,
+                "event_type": log.event_type,
+                "event_data": log.event_data,
+                "severity": log.severity,
+                "created_at": log.created_at
+            }
+            for log in logs
+        ]
+    
     finally:
         db_session.close()
\ No newline at end of file
@@ -2,6 +2,7 @@
 # Classe d'état de modèle ML (non globale, isolée par session)
 
 from typing import Any, Dict
+import numpy as np
 from sklearn.preprocessing import LabelEncoder  # type: ignore
 
 
@@ -17,9 +18,11 @@ class ModelState:
         self.model_start_time: Any | None = None
         self.model_end_time: Any | None = None
         
-        # Encodeur et mapping des IDs
+        # Encodeur des IDs (classes_ triées : ID encodé = position)
         self.id_encoder: LabelEncoder = LabelEncoder()
-        self.id_map: Dict[str, int] = {}  # ID réel -> ID encodé
+        # Index ID réel -> ID encodé, construit à la première recherche
+        # (non persisté : l'artefact ne contient que l'encodeur)
+        self._id_to_code: Dict[str, int] | None = None
         
         # État d'entraînement
         self.is_trained: bool = False
@@ -34,12 +37,32 @@ class ModelState:
         self.model_start_time = None
         self.model_end_time = None
         self.id_encoder = LabelEncoder()
-        self.id_map = {}
+        self._id_to_code = None
         self.is_trained = False
         self.trained_at = None
         self.data_row_count = 0
         self.entity_count = 0
     
+    def _find_encoded_id(self, entity_id: str) -> int | None:
+        """
+        Recherche l'ID dans l'index construit depuis les classes de l'encodeur.
+        
+        Args:
+            entity_id: ID de l'entité
+        
+        Returns:
+            ID encodé, ou None si l'ID est inconnu
+        """
+        if self._id_to_code is None:
+            classes = getattr(self.id_encoder, 'classes_', None)
+            if classes is None:
+                return None
+            # classes_ est trié et ses indices sont les codes : tolist()
+            # convertit en une passe C, range évite le boxing par élément
+            self._id_to_code = dict(zip(classes.tolist(), range(len(classes))))
+        
+        return self._id_to_code.get(entity_id)
+    
     def is_id_known(self, entity_id: str) -> bool:
         """
         Vérifie si un ID est connu dans le système.
@@ -50,7 +73,7 @@ class ModelState:
         Returns:
             True si l'entité est connue, False sinon
         """
-        return entity_id in self.id_map
+        return self._find_encoded_id(entity_id) is not None
     
     def get_encoded_id(self, entity_id: str) -> int:
         """
@@ -65,7 +88,10 @@ class ModelState:
         Raises:
             KeyError: Si l'ID n'existe pas
         """
-        return self.id_map[entity_id]
+        encoded_id = self._find_encoded_id(entity_id)
+        if encoded_id is None:
+            raise KeyError(entity_id)
+        return encoded_id
     
     def get_all_entity_ids(self) -> list[str]:
         """
@@ -74,7 +100,27 @@ class ModelState:
         Returns:
             Liste des IDs
         """
-        return list(self.id_map.keys())
+        classes = getattr(self.id_encoder, 'classes_', None)
+        return [] if classes is None else classes.tolist()
+    
+    def predict_times(self, X: Any) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Prédit les heures d'arrivée et de départ (en minutes).
+        
+        Un modèle multi-sorties (même objet pour l'arrivée et le départ)
+        n'est évalué qu'une seule fois.
+        
+        Args:
+            X: Features des dates à prédire
+        
+        Returns:
+            Tuple (minutes d'arrivée, minutes de départ)
+        """
+        if self.model_start_time is self.model_end_time:
+            predictions = self.model_start_time.predict(X)
+            return predictions[:, 0], predictions[:, 1]
+        
+        return self.model_start_time.predict(X), self.model_end_time.predict(X)
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,122 @@
+# src/work_time_prediction/core/prediction_batcher.py
+# Regroupement des appels de prédiction simultanés (micro-batching)
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from work_time_prediction.core.constants import (
+    PREDICTION_BATCH_MAX_REQUESTS, PREDICTION_BATCH_WAIT_SECONDS
+)
+from work_time_prediction.core.model_state import ModelState
+
+
+@dataclass(slots=True)
+class _PendingBatch:
+    """Requêtes en attente pour un même modèle."""
+    model_state: ModelState
+    requests: list[Tuple[np.ndarray, asyncio.Future]] = field(default_factory=list)
+    timer: Any = None
+
+
+class PredictionBatcher:
+    """
+    Regroupe les prédictions arrivant simultanément sur un même modèle.
+    
+    Les matrices de features sont empilées et le modèle n'est appelé qu'une
+    fois par lot (validation et allocation sklearn amorties), dans un thread
+    pour ne pas bloquer la boucle d'événements.
+    Toutes les méthodes s'exécutent dans la boucle asyncio : pas de verrou.
+    """
+    
+    def __init__(
+        self,
+        max_requests: int = PREDICTION_BATCH_MAX_REQUESTS,
+        max_wait_seconds: float = PREDICTION_BATCH_WAIT_SECONDS
+    ):
+        """
+        Args:
+            max_requests: Nombre de requêtes déclenchant l'envoi immédiat du lot
+            max_wait_seconds: Attente maximale avant l'envoi d'un lot incomplet
+        """
+        self.max_requests = max_requests
+        self.max_wait_seconds = max_wait_seconds
+        # (session_id, id du ModelState) -> lot en cours de constitution
+        self._pending: Dict[Tuple[str, int], _PendingBatch] = {}
+        # Références des tâches en cours (évite leur collecte prématurée)
+        self._running: set[asyncio.Task] = set()
+    
+    async def predict(
+        self,
+        session_id: str,
+        model_state: ModelState,
+        X: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Prédit les heures d'arrivée et de départ pour X au sein d'un lot.
+        
+        Args:
+            session_id: ID de la session
+            model_state: État du modèle entraîné
+            X: Matrice de features (construite par build_feature_matrix)
+        
+        Returns:
+            Tuple (minutes d'arrivée, minutes de départ) pour les lignes de X
+        """
+        loop = asyncio.get_running_loop()
+        # Un modèle réentraîné entre-temps forme un lot distinct
+        key = (session_id, id(model_state))
+        
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(model_state)
+            self._pending[key] = batch
+            batch.timer = loop.call_later(self.max_wait_seconds, self._flush, key)
+        
+        future = loop.create_future()
+        batch.requests.append((X, future))
+        
+        if len(batch.requests) >= self.max_requests:
+            batch.timer.cancel()
+            self._flush(key)
+        
+        return await future
+    
+    def _flush(self, key: Tuple[str, int]):
+        """Envoie le lot d'une clé au modèle (appelé dans la boucle)."""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+    
+    async def _run_batch(self, batch: _PendingBatch):
+        """Exécute un lot et distribue les résultats aux requêtes."""
+        try:
+            X_batch = np.vstack([X for X, _ in batch.requests])
+            pred_start, pred_end = await asyncio.to_thread(
+                batch.model_state.predict_times, X_batch
+            )
+        except Exception as e:
+            for _, future in batch.requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        offset = 0
+        for X, future in batch.requests:
+            row_count = len(X)
+            if not future.done():
+                future.set_result((
+                    pred_start[offset:offset + row_count],
+                    pred_end[offset:offset + row_count]
+                ))
+            offset += row_count
+
+
+# Instance globale
+prediction_batcher = PredictionBatcher()
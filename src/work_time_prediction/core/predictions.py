@@ -1,38 +1,45 @@
 # src/work_time_prediction/core/predictions.py
 # Logique de prédiction du Machine Learning (sans état global)
 
-from typing import Any
+from typing import Any, Callable, Optional
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date
 
 from work_time_prediction.core.constants import (
-    FEATURES, DFCols, DATE_FORMAT, WEEKDAY_NAMES, NA_VALUE
+    DFCols, DATE_FORMAT, WEEKDAY_NAMES, NA_VALUE
 )
-from work_time_prediction.core.database import get_all_data
+from work_time_prediction.core.database import get_entity_history
 from work_time_prediction.core.utils.time_converter import minutes_to_time
 from work_time_prediction.core.exceptions import ModelNotTrainedError, IDNotFoundError
 from work_time_prediction.core.model_state import ModelState
-from work_time_prediction.core.utils.temporal_features import get_week_of_month
+from work_time_prediction.core.prediction_batcher import prediction_batcher
+from work_time_prediction.core.utils.temporal_features import (
+    build_feature_matrix, get_temporal_features
+)
 
 
-def generate_predictions(
+def _prepare_predictions(
     model_state: ModelState,
     session_id: str,
     entity_id: str,
-    dates_to_predict: list[datetime]
-) -> list[dict[str, Any]]:
+    dates_to_predict: list[date],
+    history_provider: Callable[[str, str], pd.DataFrame] = get_entity_history
+) -> tuple[dict[str, dict[str, Any]], Optional[np.ndarray]]:
     """
-    Génère les prédictions pour une liste de dates données.
-    Mélange les données historiques réelles et les prédictions ML.
+    Vérifie le modèle, charge l'historique de l'entité et construit la
+    matrice de features des dates sans donnée historique.
     
     Args:
         model_state: État du modèle entraîné
         session_id: ID de la session
-        entity_id: ID de l'entité (employé, client, événement, etc.)
+        entity_id: ID de l'entité
         dates_to_predict: Liste des dates à prédire
+        history_provider: Fonction de chargement de l'historique d'une entité
+            (par défaut get_entity_history ; injectable pour les tests)
     
     Returns:
-        Liste de dictionnaires avec les prédictions
+        Tuple (historique par date, matrice des dates à prédire ou None)
     
     Raises:
         ModelNotTrainedError: Si le modèle n'est pas entraîné
@@ -48,9 +55,8 @@ def generate_predictions(
     if not model_state.is_id_known(entity_id):
         raise IDNotFoundError(entity_id)
     
-    # 1. Récupérer l'historique de l'entité
-    all_data = get_all_data(session_id)
-    entity_history = all_data[all_data[DFCols.ID] == entity_id]
+    # 1. Récupérer l'historique de l'entité (filtré directement en SQL)
+    entity_history = history_provider(session_id, entity_id)
     
     historical_data_map = {
         row[DFCols.DATE].strftime(DATE_FORMAT): {
@@ -61,42 +67,48 @@ def generate_predictions(
     }
     
     # 2. Identifier les dates qui nécessitent des prédictions
-    future_data = []
-    for date in dates_to_predict:
-        date_str = date.strftime(DATE_FORMAT)
-        if date_str not in historical_data_map:
-            # Créer les features temporelles pour cette date
-            features = {
-                DFCols.ID_ENCODED: model_state.get_encoded_id(entity_id),
-                DFCols.DAY_OF_WEEK: date.weekday(),
-                DFCols.WEEK_OF_MONTH: get_week_of_month(date),
-                DFCols.WEEK_OF_YEAR: date.isocalendar()[1],
-                DFCols.MONTH: date.month,
-                DFCols.DAY_OF_YEAR: date.timetuple().tm_yday,
-                DFCols.DATE: date  # Conserver pour le mapping
-            }
-            future_data.append(features)
-    
-    # 3. Générer les prédictions pour les dates futures
-    if future_data:
-        future_df = pd.DataFrame(future_data)
-        X_future = future_df[FEATURES]
-        
-        # Prédictions
-        pred_start_minutes = model_state.model_start_time.predict(X_future)
-        pred_end_minutes = model_state.model_end_time.predict(X_future)
-    else:
+    future_dates = [
+        target_date for target_date in dates_to_predict
+        if target_date.strftime(DATE_FORMAT) not in historical_data_map
+    ]
+    
+    if not future_dates:
         # Aucune prédiction nécessaire, toutes les dates sont historiques
-        pred_start_minutes = []
-        pred_end_minutes = []
+        return historical_data_map, None
+    
+    # Features temporelles calculées en bloc ; l'ID encodé est
+    # identique pour toutes les dates : une seule recherche
+    future_features = get_temporal_features(pd.Series(pd.to_datetime(future_dates)))
+    future_features[DFCols.ID_ENCODED] = model_state.get_encoded_id(entity_id)
+    
+    # Même matrice qu'à l'entraînement (ordre de FEATURES, float32)
+    return historical_data_map, build_feature_matrix(future_features)
+
+
+def _build_results(
+    dates_to_predict: list[date],
+    historical_data_map: dict[str, dict[str, Any]],
+    pred_start_minutes: Any,
+    pred_end_minutes: Any
+) -> list[dict[str, Any]]:
+    """
+    Assemble les résultats : données historiques réelles ou prédictions.
     
-    # 4. Construire les résultats
+    Args:
+        dates_to_predict: Liste des dates demandées
+        historical_data_map: Historique par date (format DATE_FORMAT)
+        pred_start_minutes: Prédictions d'arrivée (ordre des dates à prédire)
+        pred_end_minutes: Prédictions de départ (ordre des dates à prédire)
+    
+    Returns:
+        Liste de dictionnaires avec les prédictions
+    """
     results = []
     pred_idx = 0
     
-    for date in dates_to_predict:
-        date_str = date.strftime(DATE_FORMAT)
-        weekday = WEEKDAY_NAMES[date.weekday()]
+    for target_date in dates_to_predict:
+        date_str = target_date.strftime(DATE_FORMAT)
+        weekday = WEEKDAY_NAMES[target_date.weekday()]
         
         if date_str in historical_data_map:
             # Utiliser les données historiques réelles
@@ -150,11 +162,95 @@ def generate_predictions(
     return results
 
 
+def generate_predictions(
+    model_state: ModelState,
+    session_id: str,
+    entity_id: str,
+    dates_to_predict: list[date],
+    history_provider: Callable[[str, str], pd.DataFrame] = get_entity_history
+) -> list[dict[str, Any]]:
+    """
+    Génère les prédictions pour une liste de dates données.
+    Mélange les données historiques réelles et les prédictions ML.
+    
+    Args:
+        model_state: État du modèle entraîné
+        session_id: ID de la session
+        entity_id: ID de l'entité (employé, client, événement, etc.)
+        dates_to_predict: Liste des dates à prédire
+        history_provider: Fonction de chargement de l'historique d'une entité
+    
+    Returns:
+        Liste de dictionnaires avec les prédictions
+    
+    Raises:
+        ModelNotTrainedError: Si le modèle n'est pas entraîné
+        IDNotFoundError: Si l'ID est inconnu
+    """
+    historical_data_map, X_future = _prepare_predictions(
+        model_state, session_id, entity_id, dates_to_predict, history_provider
+    )
+    
+    pred_start_minutes: Any
+    pred_end_minutes: Any
+    if X_future is None:
+        pred_start_minutes, pred_end_minutes = [], []
+    else:
+        pred_start_minutes, pred_end_minutes = model_state.predict_times(X_future)
+    
+    return _build_results(
+        dates_to_predict, historical_data_map, pred_start_minutes, pred_end_minutes
+    )
+
+
+async def generate_predictions_batched(
+    model_state: ModelState,
+    session_id: str,
+    entity_id: str,
+    dates_to_predict: list[date],
+    history_provider: Callable[[str, str], pd.DataFrame] = get_entity_history
+) -> list[dict[str, Any]]:
+    """
+    Variante de generate_predictions pour les routes asynchrones : l'appel au
+    modèle est regroupé avec les requêtes simultanées sur la même session.
+    
+    Args:
+        model_state: État du modèle entraîné
+        session_id: ID de la session
+        entity_id: ID de l'entité
+        dates_to_predict: Liste des dates à prédire
+        history_provider: Fonction de chargement de l'historique d'une entité
+    
+    Returns:
+        Liste de dictionnaires avec les prédictions
+    
+    Raises:
+        ModelNotTrainedError: Si le modèle n'est pas entraîné
+        IDNotFoundError: Si l'ID est inconnu
+    """
+    historical_data_map, X_future = _prepare_predictions(
+        model_state, session_id, entity_id, dates_to_predict, history_provider
+    )
+    
+    pred_start_minutes: Any
+    pred_end_minutes: Any
+    if X_future is None:
+        pred_start_minutes, pred_end_minutes = [], []
+    else:
+        pred_start_minutes, pred_end_minutes = await prediction_batcher.predict(
+            session_id, model_state, X_future
+        )
+    
+    return _build_results(
+        dates_to_predict, historical_data_map, pred_start_minutes, pred_end_minutes
+    )
+
+
 def predict_single_day(
     model_state: ModelState,
     session_id: str,
     entity_id: str,
-    target_date: datetime
+    target_date: date
 ) -> dict[str, Any]:
     """
     Génère une prédiction pour une seule date.
@@ -1,18 +1,31 @@
 # src/work_time_prediction/core/quota_manager.py
 # Gestion et vérification des quotas par IP
 
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional
-from sqlalchemy import select
+from typing import Any, Dict, Iterator, Optional, Tuple, cast
+from sqlalchemy import CursorResult, select, update
+from sqlalchemy.orm import Session as SQLSession
 
 from work_time_prediction.core.database import get_main_engine, get_db_session
 from work_time_prediction.models.database import IPQuota, Session as SessionModel
 from work_time_prediction.core.constants import DEFAULT_QUOTAS
 from work_time_prediction.core.utils.logging_config import get_logger
-from work_time_prediction.core.utils.folder_manager import get_total_storage_size
+from work_time_prediction.core.utils.folder_manager import (
+    get_total_storage_size, get_sizes_by_session_bulk
+)
 
 logger = get_logger()
 
+# Colonne de compteur associée à chaque type d'action
+_COUNTER_COLUMNS = {
+    'request': 'requests_count',
+    'train': 'train_count',
+    'predict': 'predictions_count',
+}
+
 
 class QuotaManager:
     """Gestionnaire des quotas par IP."""
@@ -20,258 +33,441 @@ class QuotaManager:
     def __init__(self):
         """Initialise le gestionnaire de quotas."""
         self.quotas_config = DEFAULT_QUOTAS
+        
+        # Token bucket en mémoire pour le rate limiting des requêtes
+        # IP -> (dernier remplissage, jetons disponibles)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        # Requêtes acceptées en attente d'écriture en base
+        self._pending_requests: Dict[str, int] = {}
+        self._buckets_lock = threading.Lock()
+        
+        # Statut de bannissement en mémoire (évite un accès base par requête)
+        # IP -> (fin de validité, banni, banni jusqu'à)
+        self._ban_status: Dict[str, Tuple[float, bool, Optional[datetime]]] = {}
+        self._ban_status_lock = threading.Lock()
     
-    def get_or_create_quota(self, ip_address: str) -> IPQuota:
+    @contextmanager
+    def session_scope(
+        self,
+        db_session: Optional[SQLSession] = None
+    ) -> Iterator[SQLSession]:
         """
-        Récupère ou crée un enregistrement de quota pour une IP.
+        Fournit une session SQLAlchemy partagée par plusieurs vérifications.
+        
+        Si une session est fournie, elle est réutilisée telle quelle (l'appelant
+        gère le commit et la fermeture). Sinon, une nouvelle session est ouverte,
+        validée en une seule fois à la sortie puis fermée.
         
         Args:
-            ip_address: Adresse IP
+            db_session: Session existante (optionnel)
         
-        Returns:
-            Objet IPQuota
+        Yields:
+            Session SQLAlchemy
         """
+        if db_session is not None:
+            yield db_session
+            return
+        
         engine = get_main_engine()
-        db_session = get_db_session(engine)
+        # Les objets IPQuota sont lus après fermeture de la session
+        db_session = get_db_session(engine, expire_on_commit=False)
         
         try:
-            quota = db_session.query(IPQuota).filter(
-                IPQuota.ip_address == ip_address
-            ).first()
-            
-            if not quota:
-                quota = IPQuota(ip_address=ip_address)
-                db_session.add(quota)
-                db_session.commit()
-                db_session.refresh(quota)
-                logger.info(f"Nouveau quota créé pour IP {ip_address}")
-            
-            return quota
+            yield db_session
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
         finally:
             db_session.close()
     
-    def check_models_quota(self, ip_address: str) -> bool:
+    def _fetch_quota(self, db_session: SQLSession, ip_address: str) -> IPQuota:
         """
-        Vérifie si l'IP peut créer une nouvelle session/modèle.
+        Récupère ou crée le quota d'une IP dans une session existante.
         
         Args:
+            db_session: Session SQLAlchemy
             ip_address: Adresse IP
         
         Returns:
-            True si autorisé, False sinon
+            Objet IPQuota attaché à la session
         """
-        quota = self.get_or_create_quota(ip_address)
+        # Recherche par clé primaire (carte d'identité puis requête compilée en cache)
+        quota = db_session.get(IPQuota, ip_address)
         
-        if quota.is_currently_banned:
-            logger.warning(f"IP {ip_address} est bannie jusqu'à {quota.banned_until}")
-            return False
+        if not quota:
+            quota = IPQuota(ip_address=ip_address)
+            db_session.add(quota)
+            db_session.flush()
+            logger.info("Nouveau quota créé pour IP %s", ip_address)
         
-        max_models = self.quotas_config['models_per_ip']
+        return quota
+    
+    def get_or_create_quota(
+        self,
+        ip_address: str,
+        db_session: Optional[SQLSession] = None
+    ) -> IPQuota:
+        """
+        Récupère ou crée un enregistrement de quota pour une IP.
         
-        if quota.models_count >= max_models:
-            logger.warning(f"IP {ip_address} a atteint la limite de {max_models} modèles")
-            self._increment_violations(ip_address)
-            return False
+        Args:
+            ip_address: Adresse IP
+            db_session: Session existante à réutiliser (optionnel)
         
-        return True
+        Returns:
+            Objet IPQuota
+        """
+        with self.session_scope(db_session) as session:
+            return self._fetch_quota(session, ip_address)
     
-    def check_storage_quota(self, ip_address: str, additional_mb: float = 0) -> bool:
+    def get_ban_status(self, ip_address: str, now: datetime) -> Tuple[bool, Optional[datetime]]:
         """
-        Vérifie si l'IP respecte le quota de stockage.
+        Indique si une IP est bannie, depuis un cache en mémoire.
+        
+        La base n'est lue (et le quota créé si besoin) qu'à l'expiration de
+        l'entrée, au plus une fois toutes les ban_status_cache_seconds par IP.
         
         Args:
             ip_address: Adresse IP
-            additional_mb: Stockage additionnel prévu (en MB)
+            now: Date de référence (UTC)
         
         Returns:
-            True si autorisé, False sinon
+            Tuple (banni, banni jusqu'à)
         """
-        quota = self.get_or_create_quota(ip_address)
-        
-        if quota.is_currently_banned:
-            return False
+        monotonic_now = time.monotonic()
         
-        max_storage = self.quotas_config['max_storage_per_ip_mb']
-        total_storage = quota.storage_used_mb + additional_mb
+        with self._ban_status_lock:
+            cached = self._ban_status.get(ip_address)
         
-        if total_storage > max_storage:
-            logger.warning(
-                f"IP {ip_address} dépasserait le quota de stockage: "
-                f"{total_storage:.2f} MB > {max_storage} MB"
+        if cached is None or cached[0] <= monotonic_now:
+            quota = self.get_or_create_quota(ip_address)
+            cached = (
+                monotonic_now + self.quotas_config['ban_status_cache_seconds'],
+                bool(quota.is_banned),
+                quota.banned_until
             )
-            self._increment_violations(ip_address)
-            return False
+            with self._ban_status_lock:
+                self._ban_status[ip_address] = cached
         
-        return True
+        _, is_banned, banned_until = cached
+        # Un bannissement temporaire échu ne bloque plus, même en cache
+        if is_banned and banned_until is not None and now >= banned_until:
+            is_banned = False
+        
+        return is_banned, banned_until
     
-    def check_rate_limit(self, ip_address: str, action: str) -> bool:
+    def _invalidate_ban_status(self, ip_address: str):
         """
-        Vérifie les limites de taux (rate limiting).
+        Oublie le statut de bannissement en cache d'une IP (après un
+        bannissement ou un débannissement).
         
         Args:
             ip_address: Adresse IP
-            action: Type d'action ('request', 'train', 'predict')
+        """
+        with self._ban_status_lock:
+            self._ban_status.pop(ip_address, None)
+    
+    def check_models_quota(
+        self,
+        ip_address: str,
+        db_session: Optional[SQLSession] = None
+    ) -> bool:
+        """
+        Vérifie si l'IP peut créer une nouvelle session/modèle.
+        
+        Args:
+            ip_address: Adresse IP
+            db_session: Session existante à réutiliser (optionnel)
         
         Returns:
             True si autorisé, False sinon
         """
-        quota = self.get_or_create_quota(ip_address)
-        
-        if quota.is_currently_banned:
-            return False
+        with self.session_scope(db_session) as session:
+            quota = self._fetch_quota(session, ip_address)
+            
+            if quota.is_currently_banned_at(datetime.utcnow()):
+                logger.warning("IP %s est bannie jusqu'à %s", ip_address, quota.banned_until)
+                return False
+            
+            max_models = self.quotas_config['models_per_ip']
+            
+            if quota.models_count >= max_models:
+                logger.warning("IP %s a atteint la limite de %s modèles", ip_address, max_models)
+                self._increment_violations(session, ip_address)
+                return False
+            
+            return True
+    
+    def check_storage_quota(
+        self,
+        ip_address: str,
+        additional_mb: float = 0,
+        db_session: Optional[SQLSession] = None
+    ) -> bool:
+        """
+        Vérifie si l'IP respecte le quota de stockage.
         
-        # Vérifier si le reset est nécessaire
-        self._reset_counters_if_needed(quota)
+        Args:
+            ip_address: Adresse IP
+            additional_mb: Stockage additionnel prévu (en MB)
+            db_session: Session existante à réutiliser (optionnel)
         
-        # Vérifier les limites selon l'action
-        if action == 'request':
-            limit = self.quotas_config['requests_per_minute']
-            if quota.requests_count >= limit:
-                logger.warning(f"IP {ip_address} a atteint la limite de {limit} requêtes/minute")
-                self._increment_violations(ip_address)
+        Returns:
+            True si autorisé, False sinon
+        """
+        with self.session_scope(db_session) as session:
+            quota = self._fetch_quota(session, ip_address)
+            
+            if quota.is_currently_banned_at(datetime.utcnow()):
                 return False
-        
-        elif action == 'train':
-            limit = self.quotas_config['train_per_hour']
-            if quota.train_count >= limit:
-                logger.warning(f"IP {ip_address} a atteint la limite de {limit} entraînements/heure")
-                self._increment_violations(ip_address)
+            
+            max_storage = self.quotas_config['max_storage_per_ip_mb']
+            total_storage = quota.storage_used_mb + additional_mb
+            
+            if total_storage > max_storage:
+                logger.warning(
+                    "IP %s dépasserait le quota de stockage: %.2f MB > %s MB",
+                    ip_address, total_storage, max_storage
+                )
+                self._increment_violations(session, ip_address)
                 return False
+            
+            return True
+    
+    def check_rate_limit(
+        self,
+        ip_address: str,
+        action: str,
+        db_session: Optional[SQLSession] = None
+    ) -> bool:
+        """
+        Vérifie les limites de taux (rate limiting).
         
-        elif action == 'predict':
-            limit = self.quotas_config['predictions_per_day']
-            if quota.predictions_count >= limit:
-                logger.warning(f"IP {ip_address} a atteint la limite de {limit} prédictions/jour")
-                self._increment_violations(ip_address)
-                return False
+        Les requêtes générales ('request') sont limitées par un token bucket en
+        mémoire, sans accès à la base sauf en cas de violation. Le bannissement
+        doit alors être vérifié par l'appelant (voir QuotaMiddleware).
+        
+        Args:
+            ip_address: Adresse IP
+            action: Type d'action ('request', 'train', 'predict')
+            db_session: Session existante à réutiliser (optionnel)
         
-        return True
+        Returns:
+            True si autorisé, False sinon
+        """
+        if action == 'request':
+            return self._consume_request_token(ip_address, db_session)
+        
+        with self.session_scope(db_session) as session:
+            quota = self._fetch_quota(session, ip_address)
+            
+            if quota.is_currently_banned_at(datetime.utcnow()):
+                return False
+            
+            # Vérifier les limites selon l'action
+            if action == 'train':
+                limit = self.quotas_config['train_per_hour']
+                if quota.train_count >= limit:
+                    logger.warning("IP %s a atteint la limite de %s entraînements/heure", ip_address, limit)
+                    self._increment_violations(session, ip_address)
+                    return False
+            
+            elif action == 'predict':
+                limit = self.quotas_config['predictions_per_day']
+                if quota.predictions_count >= limit:
+                    logger.warning("IP %s a atteint la limite de %s prédictions/jour", ip_address, limit)
+                    self._increment_violations(session, ip_address)
+                    return False
+            
+            return True
     
-    def increment_counter(self, ip_address: str, action: str):
+    def increment_counter(
+        self,
+        ip_address: str,
+        action: str,
+        db_session: Optional[SQLSession] = None
+    ):
         """
         Incrémente un compteur d'action.
         
         Args:
             ip_address: Adresse IP
             action: Type d'action ('request', 'train', 'predict')
+            db_session: Session existante à réutiliser (optionnel)
         """
-        engine = get_main_engine()
-        db_session = get_db_session(engine)
+        column = _COUNTER_COLUMNS.get(action)
+        if column is None:
+            return
         
-        try:
-            quota = db_session.query(IPQuota).filter(
-                IPQuota.ip_address == ip_address
-            ).first()
-            
-            if quota:
-                if action == 'request':
-                    quota.requests_count += 1
-                elif action == 'train':
-                    quota.train_count += 1
-                elif action == 'predict':
-                    quota.predictions_count += 1
-                
-                db_session.commit()
-        finally:
-            db_session.close()
+        # Incrément atomique côté base (pas de lecture-modification-écriture)
+        with self.session_scope(db_session) as session:
+            IPQuota.bump(session, ip_address, **{column: 1})
     
-    def update_storage(self, ip_address: str):
+    def _consume_request_token(
+        self,
+        ip_address: str,
+        db_session: Optional[SQLSession] = None
+    ) -> bool:
         """
-        Met à jour le stockage utilisé par une IP.
+        Consomme un jeton du token bucket de l'IP.
+        Le bucket se remplit au rythme de requests_per_minute / 60 jetons par seconde.
         
         Args:
             ip_address: Adresse IP
-        """
-        # Calculer le stockage réel utilisé
-        from work_time_prediction.core.database import get_main_engine, get_db_session
+            db_session: Session existante à réutiliser en cas de violation (optionnel)
         
-        engine = get_main_engine()
-        db_session = get_db_session(engine)
+        Returns:
+            True si autorisé, False sinon
+        """
+        limit = self.quotas_config['requests_per_minute']
+        refill_rate = limit / 60.0
+        now = time.monotonic()
         
-        try:
-            # Récupérer toutes les sessions de cette IP
-            sessions = db_session.query(SessionModel).filter(
-                SessionModel.ip_address == ip_address
-            ).all()
+        with self._buckets_lock:
+            last_refill, tokens = self._buckets.get(ip_address, (now, float(limit)))
+            tokens = min(float(limit), tokens + (now - last_refill) * refill_rate)
             
-            total_storage = 0
-            for session in sessions:
-                from work_time_prediction.core.utils.folder_manager import get_session_storage_size
-                total_storage += get_session_storage_size(session.session_id)
+            is_allowed = tokens >= 1.0
+            if is_allowed:
+                tokens -= 1.0
+                self._pending_requests[ip_address] = self._pending_requests.get(ip_address, 0) + 1
             
-            # Mettre à jour le quota
-            quota = db_session.query(IPQuota).filter(
-                IPQuota.ip_address == ip_address
-            ).first()
-            
-            if quota:
-                quota.storage_used_mb = total_storage
-                db_session.commit()
-                logger.debug(f"Stockage mis à jour pour {ip_address}: {total_storage:.2f} MB")
+            self._buckets[ip_address] = (now, tokens)
         
-        finally:
-            db_session.close()
+        if not is_allowed:
+            logger.warning("IP %s a atteint la limite de %s requêtes/minute", ip_address, limit)
+            with self.session_scope(db_session) as session:
+                self._increment_violations(session, ip_address)
+        
+        return is_allowed
     
-    def _reset_counters_if_needed(self, quota: IPQuota):
+    def flush_request_counts(self) -> int:
         """
-        Réinitialise les compteurs si nécessaire (basé sur last_reset).
+        Écrit en base les compteurs de requêtes accumulés en mémoire et
+        supprime les buckets pleins (IPs inactives).
+        À appeler périodiquement (tâche planifiée) et à l'arrêt de l'application.
         
-        Args:
-            quota: Objet IPQuota
+        Returns:
+            Nombre d'IPs mises à jour
+        """
+        limit = float(self.quotas_config['requests_per_minute'])
+        refill_rate = limit / 60.0
+        now = time.monotonic()
+        
+        with self._buckets_lock:
+            pending = self._pending_requests
+            self._pending_requests = {}
+            
+            self._buckets = {
+                ip: (last_refill, tokens)
+                for ip, (last_refill, tokens) in self._buckets.items()
+                if tokens + (now - last_refill) * refill_rate < limit
+            }
+        
+        # Statuts de bannissement expirés : relus au prochain accès de l'IP
+        monotonic_now = time.monotonic()
+        with self._ban_status_lock:
+            self._ban_status = {
+                ip: status
+                for ip, status in self._ban_status.items()
+                if status[0] > monotonic_now
+            }
+        
+        if not pending:
+            return 0
+        
+        with self.session_scope() as session:
+            for ip_address, count in pending.items():
+                IPQuota.bump(session, ip_address, requests_count=count)
+        
+        return len(pending)
+    
+    def reset_expired_counters(self) -> int:
+        """
+        Réinitialise en une seule requête les compteurs de toutes les IPs
+        dont le dernier reset date de plus d'une heure.
+        À appeler périodiquement (tâche planifiée).
+        
+        Returns:
+            Nombre d'IPs réinitialisées
         """
         now = datetime.utcnow()
-        time_since_reset = now - quota.last_reset
         
-        # Réinitialiser toutes les heures
-        if time_since_reset > timedelta(hours=1):
-            engine = get_main_engine()
-            db_session = get_db_session(engine)
+        with self.session_scope() as session:
+            # UPDATE en masse : le résultat est un CursorResult (rowcount)
+            result = cast(CursorResult[Any], session.execute(
+                update(IPQuota)
+                .where(IPQuota.last_reset < now - timedelta(hours=1))
+                .values(
+                    requests_count=0,
+                    train_count=0,
+                    predictions_count=0,
+                    last_reset=now
+                )
+            ))
+        
+        if result.rowcount:
+            logger.debug("Compteurs réinitialisés pour %d IPs", result.rowcount)
+        
+        return result.rowcount
+    
+    def update_storage(self, ip_address: str):
+        """
+        Met à jour le stockage utilisé par une IP.
+        
+        Args:
+            ip_address: Adresse IP
+        """
+        with self.session_scope() as session:
+            # Récupérer les IDs de toutes les sessions de cette IP
+            session_ids = session.execute(
+                select(SessionModel.session_id).where(SessionModel.ip_address == ip_address)
+            ).scalars().all()
             
-            try:
-                quota.requests_count = 0
-                quota.train_count = 0
-                quota.predictions_count = 0
-                quota.last_reset = now
-                
-                db_session.commit()
-                logger.debug(f"Compteurs réinitialisés pour {quota.ip_address}")
-            finally:
-                db_session.close()
+            # Calculer le stockage réel utilisé (un seul parcours disque)
+            sizes = get_sizes_by_session_bulk(session_ids)
+            total_storage = sum(sizes.values()) / (1024 * 1024)  # Conversion en MB
+            
+            # Mettre à jour le quota
+            quota = self._fetch_quota(session, ip_address)
+            quota.storage_used_mb = total_storage
+            logger.debug("Stockage mis à jour pour %s: %.2f MB", ip_address, total_storage)
     
-    def _increment_violations(self, ip_address: str):
+    def _increment_violations(self, db_session: SQLSession, ip_address: str):
         """
         Incrémente le compteur de violations et bannit si nécessaire.
+        Les deux opérations sont des UPDATE atomiques.
         
         Args:
+            db_session: Session SQLAlchemy
             ip_address: Adresse IP
         """
-        engine = get_main_engine()
-        db_session = get_db_session(engine)
+        IPQuota.bump(db_session, ip_address, violations_count=1)
+        
+        ban_threshold = self.quotas_config['ban_after_violations']
+        ban_duration = timedelta(hours=self.quotas_config['ban_duration_hours'])
+        
+        # Bannir l'IP si le seuil est atteint et qu'elle n'est pas déjà bannie
+        result = cast(CursorResult[Any], db_session.execute(
+            update(IPQuota)
+            .where(
+                IPQuota.ip_address == ip_address,
+                IPQuota.violations_count >= ban_threshold,
+                IPQuota.is_banned.is_(False)
+            )
+            .values(
+                is_banned=True,
+                banned_until=datetime.utcnow() + ban_duration
+            )
+        ))
         
-        try:
-            quota = db_session.query(IPQuota).filter(
-                IPQuota.ip_address == ip_address
-            ).first()
-            
-            if quota:
-                quota.violations_count += 1
-                
-                ban_threshold = self.quotas_config['ban_after_violations']
-                
-                if quota.violations_count >= ban_threshold and not quota.is_banned:
-                    # Bannir l'IP
-                    ban_duration = timedelta(hours=self.quotas_config['ban_duration_hours'])
-                    quota.is_banned = True
-                    quota.banned_until = datetime.utcnow() + ban_duration
-                    
-                    logger.error(
-                        f"IP {ip_address} BANNIE pour {ban_duration.total_seconds()/3600}h "
-                        f"({quota.violations_count} violations)"
-                    )
-                
-                db_session.commit()
-        finally:
-            db_session.close()
+        if result.rowcount:
+            self._invalidate_ban_status(ip_address)
+            logger.error(
+                "IP %s BANNIE pour %sh (seuil de %s violations atteint)",
+                ip_address, ban_duration.total_seconds() / 3600, ban_threshold
+            )
     
     def unban_ip(self, ip_address: str):
         """
@@ -284,20 +480,19 @@ class QuotaManager:
         db_session = get_db_session(engine)
         
         try:
-            quota = db_session.query(IPQuota).filter(
-                IPQuota.ip_address == ip_address
-            ).first()
+            quota = db_session.get(IPQuota, ip_address)
             
             if quota:
                 quota.is_banned = False
                 quota.banned_until = None
                 quota.violations_count = 0
                 db_session.commit()
+                self._invalidate_ban_status(ip_address)
                 
-                logger.info(f"IP {ip_address} débannie")
+                logger.info("IP %s débannie", ip_address)
         finally:
             db_session.close()
 
 
 # Instance globale
-quota_manager = QuotaManager()
\ No newline at end of file
+quota_manager = QuotaManager()
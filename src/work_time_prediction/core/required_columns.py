@@ -1,21 +1,23 @@
 # Configuration globale des colonnes
 from __future__ import annotations
-from copy import copy
+from dataclasses import dataclass, replace
 
+# Table de traduction précalculée : espaces -> underscores
+_CLEAN_TABLE = str.maketrans({" ": "_"})
+
+
+@dataclass(slots=True)
 class RequiredColumnsMapping:
-    def __init__(
-            self, id_column: str, date_column: str, start_time_column: str, end_time_column: str
-    ) -> None:
-        self.id = id_column
-        self.date = date_column
-        self.start_time = start_time_column
-        self.end_time = end_time_column
+    id: str
+    date: str
+    start_time: str
+    end_time: str
 
     def clean(self) -> RequiredColumnsMapping:
-        column_clean = copy(self)
-        column_clean.id = self.id.replace(" ", "_")
-        column_clean.date = self.date.replace(" ", "_")
-        column_clean.start_time = self.start_time.replace(" ", "_")
-        column_clean.end_time = self.end_time.replace(" ", "_")
-        return column_clean
-
+        return replace(
+            self,
+            id=self.id.translate(_CLEAN_TABLE),
+            date=self.date.translate(_CLEAN_TABLE),
+            start_time=self.start_time.translate(_CLEAN_TABLE),
+            end_time=self.end_time.translate(_CLEAN_TABLE),
+        )
@@ -1,6 +1,7 @@
 # src/work_time_prediction/core/security/admin_auth.py
 # Authentification et autorisation pour les endpoints admin
 
+import hashlib
 import secrets
 import os
 from fastapi import Header, HTTPException, status
@@ -17,6 +18,7 @@ class AdminAuth:
     def __init__(self):
         """Initialise l'authentification admin."""
         self._admin_token: Optional[str] = None
+        self._admin_token_hash: Optional[bytes] = None
         self._is_dev_mode: bool = False
         self._load_admin_token()
     
@@ -30,10 +32,18 @@ class AdminAuth:
             self._admin_token = secrets.token_urlsafe(32)
             
             logger.warning("Mode développement activé")
-            logger.warning(f"Token admin éphémère généré: {self._admin_token}")
+            logger.warning("Token admin éphémère généré: %s", self._admin_token)
             logger.warning("Pour la production, définissez: export ADMIN_TOKEN='your-secure-token'")
         else:
             logger.info("Token admin chargé depuis la variable d'environnement ADMIN_TOKEN")
+        
+        # Empreinte précalculée : la comparaison porte toujours sur 32 bytes
+        self._admin_token_hash = self._hash_token(self._admin_token)
+    
+    @staticmethod
+    def _hash_token(token: str) -> bytes:
+        """Retourne l'empreinte SHA-256 d'un token."""
+        return hashlib.sha256(token.encode('utf-8')).digest()
     
     def verify_token(self, token: str) -> bool:
         """
@@ -45,15 +55,16 @@ class AdminAuth:
         Returns:
             True si valide, False sinon
         """
-        if not self._admin_token:
+        if not self._admin_token_hash:
             logger.error("Tentative de vérification sans token configuré")
             return False
         
-        # Utiliser secrets.compare_digest pour éviter les timing attacks
-        is_valid = secrets.compare_digest(token, self._admin_token)
+        # Comparer les empreintes avec secrets.compare_digest pour éviter les
+        # timing attacks, indépendamment de la taille du token fourni
+        is_valid = secrets.compare_digest(self._hash_token(token), self._admin_token_hash)
         
         if not is_valid:
-            logger.warning(f"Tentative d'accès admin avec token invalide (début: {token[:8]}...)")
+            logger.warning("Tentative d'accès admin avec token invalide (début: %s...)", token[:8])
         
         return is_valid
     
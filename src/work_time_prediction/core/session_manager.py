@@ -1,30 +1,38 @@
 # src/work_time_prediction/core/session_manager.py
 # Gestion des sessions utilisateur et persistance des modèles (refactorisé)
 
+import os
 import pickle
-import json
+import orjson
+import threading
+import joblib  # type: ignore
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any
-from cachetools import LRUCache
+from cachetools import TTLCache
 
 from work_time_prediction.core.constants import (
-    JWT_EXPIRATION_DAYS, SESSION_TOKEN_BYTES, MAX_MODELS_IN_CACHE,
+    JWT_EXPIRATION_DAYS, MAX_MODELS_IN_CACHE, CACHE_TTL_SECONDS,
+    SESSION_LAST_ACCESSED_UPDATE_SECONDS,
     SecurityEventType, LogSeverity, ErrorMessages, SuccessMessages
 )
 from work_time_prediction.core.model_state import ModelState
 from work_time_prediction.core.database import (
     init_main_database, init_session_database,
     create_session_record, get_session_record, delete_session_record,
+    delete_expired_session_records,
     update_session_last_accessed, create_security_log
 )
 from work_time_prediction.core.utils.folder_manager import (
     create_session_directory, delete_session_directory,
-    get_session_metadata_path, get_session_model_arrival_path,
+    get_session_metadata_path, get_session_model_path, get_session_model_arrival_path,
     get_session_model_departure_path, get_session_encoder_path,
     session_exists
 )
-from work_time_prediction.core.utils.token_generator import generate_secure_token
+from work_time_prediction.core.utils.token_generator import generate_session_id
+from work_time_prediction.core.utils.logging_config import get_logger
+
+logger = get_logger()
 
 
 class SessionManager:
@@ -32,8 +40,20 @@ class SessionManager:
     
     def __init__(self):
         """Initialise le gestionnaire de sessions."""
-        # Cache LRU pour les modèles chargés en mémoire
-        self._model_cache: LRUCache = LRUCache(maxsize=MAX_MODELS_IN_CACHE)
+        # Cache borné des modèles chargés en mémoire. TTLCache expire une entrée
+        # selon son âge d'insertion : get_cached_model la réinsère à chaque
+        # accès, seuls les modèles inutilisés depuis CACHE_TTL_SECONDS sont libérés
+        self._model_cache: TTLCache = TTLCache(maxsize=MAX_MODELS_IN_CACHE, ttl=CACHE_TTL_SECONDS)
+        self._model_cache_lock = threading.Lock()
+        
+        # Écriture des modèles sur disque en arrière-plan (un seul thread écrivain :
+        # les écritures d'une même session restent ordonnées)
+        self._save_thread: Optional[threading.Thread] = None
+        # session_id -> dernier état à écrire (un nouvel état remplace l'ancien non écrit)
+        self._pending_saves: Dict[str, ModelState] = {}
+        # Session en cours d'écriture
+        self._writing_session: Optional[str] = None
+        self._pending_saves_cond = threading.Condition()
         
         # Initialiser la base de données
         init_main_database()
@@ -54,7 +74,7 @@ class SessionManager:
             str: ID de session (token sécurisé)
         """
         # Générer un ID de session sécurisé
-        session_id = generate_secure_token(SESSION_TOKEN_BYTES)
+        session_id = generate_session_id()
         
         # Dates
         now = datetime.utcnow()
@@ -79,7 +99,7 @@ class SessionManager:
             ip_address=ip_address,
             event_type=SecurityEventType.SESSION_CREATED,
             session_id=session_id,
-            event_data=json.dumps({'expires_at': expires_at.isoformat()}),
+            event_data=orjson.dumps({'expires_at': expires_at.isoformat()}).decode(),
             severity=LogSeverity.INFO
         )
         
@@ -105,8 +125,10 @@ class SessionManager:
         if not session_record:
             return None
         
+        now = datetime.utcnow()
+        
         # Vérifier l'expiration
-        if session_record.is_expired:
+        if session_record.is_expired_at(now):
             self.delete_session(session_id)
             return None
         
@@ -116,23 +138,25 @@ class SessionManager:
                 ip_address=current_ip,
                 event_type=SecurityEventType.IP_CHANGED,
                 session_id=session_id,
-                event_data=json.dumps({
+                event_data=orjson.dumps({
                     'old_ip': session_record.ip_address,
                     'new_ip': current_ip
-                }),
+                }).decode(),
                 severity=LogSeverity.WARNING
             )
         
-        # Mettre à jour le dernier accès
-        update_session_last_accessed(session_id)
+        # Mettre à jour le dernier accès (au plus une fois par intervalle)
+        elapsed = now - session_record.last_accessed
+        if elapsed > timedelta(seconds=SESSION_LAST_ACCESSED_UPDATE_SECONDS):
+            update_session_last_accessed(session_id, now)
         
-        # Convertir en dictionnaire
+        # Convertir en dictionnaire (datetimes sérialisés par pydantic)
         return {
             'session_id': session_record.session_id,
             'ip_address': session_record.ip_address,
-            'created_at': session_record.created_at.isoformat(),
-            'last_accessed': session_record.last_accessed.isoformat(),
-            'expires_at': session_record.expires_at.isoformat(),
+            'created_at': session_record.created_at,
+            'last_accessed': session_record.last_accessed,
+            'expires_at': session_record.expires_at,
             'metadata': session_record.session_metadata
         }
     
@@ -146,29 +170,28 @@ class SessionManager:
         Returns:
             bool: True si supprimé, False si non trouvé
         """
-        session_record = get_session_record(session_id)
+        # Supprimer l'enregistrement de la base de données
+        ip_address = delete_session_record(session_id)
         
-        if not session_record:
+        if ip_address is None:
             return False
         
         # Supprimer du cache mémoire
-        if session_id in self._model_cache:
-            del self._model_cache[session_id]
+        with self._model_cache_lock:
+            self._model_cache.pop(session_id, None)
         
-        # Supprimer le répertoire et tous les fichiers
+        # Supprimer le répertoire et tous les fichiers (après une éventuelle écriture en cours)
+        self.wait_for_pending_save(session_id)
         delete_session_directory(session_id)
         
         # Log de sécurité
         create_security_log(
-            ip_address=session_record.ip_address,
+            ip_address=ip_address,
             event_type=SecurityEventType.SESSION_DELETED,
             session_id=session_id,
             severity=LogSeverity.INFO
         )
         
-        # Supprimer l'enregistrement de la base de données
-        delete_session_record(session_id)
-        
         return True
     
     def save_model(
@@ -178,6 +201,8 @@ class SessionManager:
     ):
         """
         Sauvegarde un ModelState dans la session.
+        Le modèle est mis en cache immédiatement ; l'écriture des fichiers est
+        effectuée par un thread d'arrière-plan.
         
         Args:
             session_id: ID de la session
@@ -186,27 +211,12 @@ class SessionManager:
         if not session_exists(session_id):
             raise ValueError(ErrorMessages.SESSION_NOT_FOUND)
         
-        # Sauvegarder les modèles
-        with open(get_session_model_arrival_path(session_id), 'wb') as f:
-            pickle.dump(model_state.model_start_time, f)
-        
-        with open(get_session_model_departure_path(session_id), 'wb') as f:
-            pickle.dump(model_state.model_end_time, f)
-        
-        with open(get_session_encoder_path(session_id), 'wb') as f:
-            pickle.dump({
-                'encoder': model_state.id_encoder,
-                'id_map': model_state.id_map
-            }, f)
-        
-        # Sauvegarder les métadonnées
-        metadata = model_state.to_dict()
-        
-        with open(get_session_metadata_path(session_id), 'w') as f:
-            json.dump(metadata, f, indent=2)
+        # Mettre en file l'écriture sur disque : la requête n'attend pas les fichiers
+        self._enqueue_save(session_id, model_state)
         
         # Mettre en cache
-        self._model_cache[session_id] = model_state
+        with self._model_cache_lock:
+            self._model_cache[session_id] = model_state
         
         # Log de sécurité
         session_record = get_session_record(session_id)
@@ -215,13 +225,131 @@ class SessionManager:
                 ip_address=session_record.ip_address,
                 event_type=SecurityEventType.MODEL_TRAINED,
                 session_id=session_id,
-                event_data=json.dumps({
+                event_data=orjson.dumps({
                     'entity_count': model_state.entity_count,
                     'data_row_count': model_state.data_row_count
-                }),
+                }).decode(),
                 severity=LogSeverity.INFO
             )
     
+    def _enqueue_save(self, session_id: str, model_state: ModelState):
+        """
+        Confie l'écriture d'un modèle au thread écrivain, sans bloquer.
+        Si une écriture de la session est déjà en attente, seul le dernier
+        état est conservé.
+        
+        Args:
+            session_id: ID de la session
+            model_state: État du modèle à écrire
+        """
+        with self._pending_saves_cond:
+            if self._save_thread is None or not self._save_thread.is_alive():
+                self._save_thread = threading.Thread(
+                    target=self._save_worker, name="model-writer", daemon=True
+                )
+                self._save_thread.start()
+            
+            self._pending_saves[session_id] = model_state
+            self._pending_saves_cond.notify_all()
+    
+    def _save_worker(self):
+        """Boucle du thread écrivain : écrit les modèles en attente, du plus ancien au plus récent."""
+        while True:
+            with self._pending_saves_cond:
+                self._pending_saves_cond.wait_for(lambda: self._pending_saves)
+                session_id = next(iter(self._pending_saves))
+                model_state = self._pending_saves.pop(session_id)
+                self._writing_session = session_id
+            
+            try:
+                self._write_model_files(session_id, model_state)
+            except Exception as e:
+                logger.error("Erreur lors de l'écriture du modèle de la session %s: %s", session_id, e, exc_info=True)
+            finally:
+                with self._pending_saves_cond:
+                    self._writing_session = None
+                    self._pending_saves_cond.notify_all()
+    
+    def _write_model_files(self, session_id: str, model_state: ModelState):
+        """
+        Écrit l'artefact du modèle puis les métadonnées de façon atomique
+        (fichier temporaire + os.replace).
+        Les métadonnées sont écrites en dernier : elles signalent un modèle complet.
+        
+        Args:
+            session_id: ID de la session
+            model_state: État du modèle à écrire
+        """
+        if not session_exists(session_id):
+            return
+        
+        # Sauvegarder les modèles et l'encodeur dans un seul artefact
+        # (tableaux NumPy des arbres stockés de façon contiguë, pickle protocole 5)
+        model_path = get_session_model_path(session_id)
+        tmp_model_path = model_path.with_name(model_path.name + '.tmp')
+        joblib.dump(
+            {
+                'model_start_time': model_state.model_start_time,
+                'model_end_time': model_state.model_end_time,
+                'encoder': model_state.id_encoder
+            },
+            tmp_model_path,
+            compress=0,  # Non compressé : requis pour la projection mémoire au chargement
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+        os.replace(tmp_model_path, model_path)
+        
+        # Sauvegarder les métadonnées
+        metadata_path = get_session_metadata_path(session_id)
+        tmp_metadata_path = metadata_path.with_name(metadata_path.name + '.tmp')
+        with open(tmp_metadata_path, 'wb') as f:
+            f.write(orjson.dumps(model_state.to_dict(), option=orjson.OPT_INDENT_2))
+        os.replace(tmp_metadata_path, metadata_path)
+    
+    def wait_for_pending_save(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Attend la fin des écritures en cours pour une session.
+        
+        Args:
+            session_id: ID de la session
+            timeout: Délai maximal en secondes (None = illimité)
+        
+        Returns:
+            True si aucune écriture n'est plus en attente
+        """
+        with self._pending_saves_cond:
+            return self._pending_saves_cond.wait_for(
+                lambda: session_id not in self._pending_saves and self._writing_session != session_id,
+                timeout
+            )
+    
+    def flush_pending_saves(self):
+        """Attend l'écriture de tous les modèles en attente (à l'arrêt de l'application)."""
+        with self._pending_saves_cond:
+            self._pending_saves_cond.wait_for(
+                lambda: not self._pending_saves and self._writing_session is None
+            )
+    
+    def get_cached_model(self, session_id: str) -> Optional[ModelState]:
+        """
+        Retourne le modèle d'une session s'il est en cache, sans accès disque.
+        L'entrée est réinsérée : son délai d'expiration repart de zéro.
+        
+        Args:
+            session_id: ID de la session
+        
+        Returns:
+            ModelState ou None si absent du cache
+        """
+        with self._model_cache_lock:
+            # Une seule recherche : l'entrée peut expirer entre un test
+            # d'appartenance et la lecture
+            cached_state = self._model_cache.get(session_id)
+            if cached_state is not None:
+                self._model_cache[session_id] = cached_state
+        
+        return cached_state
+    
     def load_model(self, session_id: str) -> Optional[ModelState]:
         """
         Charge un ModelState depuis la session.
@@ -234,13 +362,17 @@ class SessionManager:
             ModelState ou None si non trouvé
         """
         # Vérifier le cache d'abord
-        if session_id in self._model_cache:
-            return self._model_cache[session_id]
+        cached_state = self.get_cached_model(session_id)
+        if cached_state is not None:
+            return cached_state
         
         # Vérifier que la session existe
         if not session_exists(session_id):
             return None
         
+        # Attendre une éventuelle écriture en cours pour cette session
+        self.wait_for_pending_save(session_id)
+        
         # Vérifier que les fichiers de modèle existent
         metadata_path = get_session_metadata_path(session_id)
         if not metadata_path.exists():
@@ -251,74 +383,132 @@ class SessionManager:
             model_state = ModelState()
             
             # Charger les modèles
-            with open(get_session_model_arrival_path(session_id), 'rb') as f:
-                model_state.model_start_time = pickle.load(f)
-            
-            with open(get_session_model_departure_path(session_id), 'rb') as f:
-                model_state.model_end_time = pickle.load(f)
+            model_path = get_session_model_path(session_id)
+            if model_path.exists():
+                # Tableaux NumPy projetés en mémoire (lecture seule) :
+                # pages partagées via le cache du système
+                artifact = joblib.load(model_path, mmap_mode='r')
+            else:
+                artifact = self._load_legacy_artifact(session_id)
             
-            with open(get_session_encoder_path(session_id), 'rb') as f:
-                encoder_data = pickle.load(f)
-                model_state.id_encoder = encoder_data['encoder']
-                model_state.id_map = encoder_data['id_map']
+            model_state.model_start_time = artifact['model_start_time']
+            model_state.model_end_time = artifact['model_end_time']
+            model_state.id_encoder = artifact['encoder']
             
             # Charger les métadonnées
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            with open(metadata_path, 'rb') as f:
+                metadata = orjson.loads(f.read())
                 model_state.is_trained = metadata.get('is_trained', False)
                 model_state.trained_at = metadata.get('trained_at')
                 model_state.data_row_count = metadata.get('data_row_count', 0)
                 model_state.entity_count = metadata.get('entity_count', 0)
             
             # Mettre en cache
-            self._model_cache[session_id] = model_state
+            with self._model_cache_lock:
+                self._model_cache[session_id] = model_state
             
             return model_state
         
         except Exception as e:
-            print(f"Erreur lors du chargement du modèle: {e}")
+            logger.error("Erreur lors du chargement du modèle: %s", e)
             return None
     
+    def get_model_summary(self, session_id: str) -> Dict[str, Any]:
+        """
+        Retourne l'état d'entraînement et les compteurs d'une session sans
+        charger les modèles (cache mémoire, sinon fichier de métadonnées seul).
+        
+        Args:
+            session_id: ID de la session
+        
+        Returns:
+            Dict avec is_trained, entity_count et data_row_count
+        """
+        cached_state = self.get_cached_model(session_id)
+        if cached_state is not None:
+            return {
+                'is_trained': cached_state.is_trained,
+                'entity_count': cached_state.entity_count,
+                'data_row_count': cached_state.data_row_count
+            }
+        
+        # Attendre une éventuelle écriture en cours pour cette session
+        self.wait_for_pending_save(session_id)
+        
+        try:
+            with open(get_session_metadata_path(session_id), 'rb') as f:
+                metadata = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            metadata = {}
+        
+        return {
+            'is_trained': metadata.get('is_trained', False),
+            'entity_count': metadata.get('entity_count', 0),
+            'data_row_count': metadata.get('data_row_count', 0)
+        }
+    
+    def _load_legacy_artifact(self, session_id: str) -> Dict[str, Any]:
+        """
+        Charge les modèles d'une session sauvegardée avec l'ancien format
+        (un fichier pickle par modèle + un pour l'encodeur).
+        
+        Args:
+            session_id: ID de la session
+        
+        Returns:
+            Dictionnaire au format de l'artefact combiné
+        """
+        with open(get_session_model_arrival_path(session_id), 'rb') as f:
+            model_start_time = pickle.load(f)
+        
+        with open(get_session_model_departure_path(session_id), 'rb') as f:
+            model_end_time = pickle.load(f)
+        
+        with open(get_session_encoder_path(session_id), 'rb') as f:
+            encoder_data = pickle.load(f)
+        
+        return {
+            'model_start_time': model_start_time,
+            'model_end_time': model_end_time,
+            'encoder': encoder_data['encoder']
+        }
+    
     def cleanup_expired_sessions(self) -> int:
         """
         Nettoie toutes les sessions expirées.
+        Les enregistrements sont supprimés par lots (transactions courtes),
+        puis les répertoires sont supprimés un par un.
         
         Returns:
             Nombre de sessions supprimées
         """
-        from work_time_prediction.core.database import get_main_engine, get_db_session
-        from work_time_prediction.models.database import Session
+        expired_ids = delete_expired_session_records(datetime.utcnow())
         
-        engine = get_main_engine()
-        db_session = get_db_session(engine)
-        
-        try:
-            # Trouver toutes les sessions expirées
-            expired = db_session.query(Session).filter(
-                Session.expires_at <= datetime.utcnow()
-            ).all()
-            
-            count = 0
-            for session_record in expired:
-                if self.delete_session(session_record.session_id):
-                    count += 1
+        for session_id in expired_ids:
+            # Supprimer du cache mémoire
+            with self._model_cache_lock:
+                self._model_cache.pop(session_id, None)
             
-            return count
+            # Supprimer le répertoire et tous les fichiers
+            self.wait_for_pending_save(session_id)
+            delete_session_directory(session_id)
         
-        finally:
-            db_session.close()
+        return len(expired_ids)
     
     def clear_cache(self):
         """Vide complètement le cache de modèles."""
-        self._model_cache.clear()
+        with self._model_cache_lock:
+            self._model_cache.clear()
     
     def get_cache_info(self) -> Dict[str, Any]:
         """Retourne des infos sur le cache de modèles."""
-        return {
-            'cache_size': len(self._model_cache),
-            'max_cache_size': MAX_MODELS_IN_CACHE,
-            'cached_sessions': list(self._model_cache.keys())
-        }
+        with self._model_cache_lock:
+            return {
+                'cache_size': len(self._model_cache),
+                'max_cache_size': MAX_MODELS_IN_CACHE,
+                'cache_ttl_seconds': CACHE_TTL_SECONDS,
+                'cached_sessions': list(self._model_cache.keys())
+            }
 
 
 # Instance globale (mais qui gère des états isolés par session !)
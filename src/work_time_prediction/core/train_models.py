@@ -1,23 +1,127 @@
 # src/work_time_prediction/core/train_models.py
 # Logique d'entraînement des modèles ML (sans état global)
 
-from sklearn.ensemble import RandomForestRegressor  # type: ignore
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Callable
+from sklearn.ensemble import (  # type: ignore
+    HistGradientBoostingRegressor, RandomForestRegressor
+)
 
 from work_time_prediction.core.constants import (
     FEATURES, DFCols, ML_N_ESTIMATORS, ML_RANDOM_STATE, 
-    ML_N_JOBS, ML_MAX_DEPTH
+    ML_N_JOBS, ML_PARALLEL_MIN_ROWS, ML_MAX_DEPTH, ML_MAX_FEATURES, ML_MIN_SAMPLES_LEAF,
+    ML_MIN_SAMPLES_LEAF_ROWS_DIVISOR,
+    ML_MODEL_TYPE, ML_MODEL_TYPE_HGB, ML_MODEL_TYPE_RANDOM_FOREST,
+    ML_HGB_MAX_ITER, ML_HGB_MAX_DEPTH, ML_HGB_LEARNING_RATE, ML_HGB_EARLY_STOPPING_MIN_ROWS,
+    ML_HGB_CATEGORICAL_FEATURES, ML_HGB_MAX_CATEGORIES
 )
 from work_time_prediction.core.database import get_all_data
+from work_time_prediction.core.utils.temporal_features import build_feature_matrix
 from work_time_prediction.core.model_state import ModelState
 from work_time_prediction.core.exceptions import NoDataFoundError
 
 
-def train_models(session_id: str) -> ModelState:
+# Hyperparamètres exposés par get_model_info (selon le type de modèle)
+_REPORTED_MODEL_PARAMS = (
+    'n_estimators', 'max_iter', 'max_depth', 'max_features',
+    'min_samples_leaf', 'learning_rate', 'early_stopping', 'random_state'
+)
+
+
+def _get_n_jobs(row_count: int) -> int:
+    """
+    Retourne le nombre de jobs pour l'entraînement.
+    
+    Les petits jeux de données sont entraînés sur un seul cœur ; sinon
+    tous les cœurs alloués par ML_N_JOBS sont utilisés.
+    
+    Args:
+        row_count: Nombre de lignes d'entraînement
+    
+    Returns:
+        Nombre de jobs (au moins 1)
+    """
+    if row_count < ML_PARALLEL_MIN_ROWS:
+        return 1
+    return ML_N_JOBS if ML_N_JOBS > 0 else (os.cpu_count() or 1)
+
+
+def _get_categorical_features(entity_count: int) -> list[int]:
+    """
+    Retourne les indices (dans FEATURES) des features à traiter comme
+    catégorielles par le HistGradientBoostingRegressor.
+    
+    L'ID encodé n'est catégoriel que si le nombre d'entités tient dans
+    max_bins ; au-delà il reste une feature numérique.
+    
+    Args:
+        entity_count: Nombre d'entités distinctes
+    
+    Returns:
+        Liste des indices de colonnes catégorielles
+    """
+    return [
+        FEATURES.index(col)
+        for col in ML_HGB_CATEGORICAL_FEATURES
+        if col != DFCols.ID_ENCODED or entity_count <= ML_HGB_MAX_CATEGORIES
+    ]
+
+
+def _build_regressor(entity_count: int, row_count: int, n_jobs: int) -> Any:
+    """
+    Crée un régresseur non entraîné selon ML_MODEL_TYPE.
+    
+    Args:
+        entity_count: Nombre d'entités distinctes
+        row_count: Nombre de lignes d'entraînement
+        n_jobs: Nombre de jobs (RandomForest uniquement)
+    
+    Returns:
+        Régresseur scikit-learn
+    
+    Raises:
+        ValueError: Si ML_MODEL_TYPE est inconnu
+    """
+    if ML_MODEL_TYPE == ML_MODEL_TYPE_HGB:
+        return HistGradientBoostingRegressor(
+            max_iter=ML_HGB_MAX_ITER,
+            max_depth=ML_HGB_MAX_DEPTH,
+            learning_rate=ML_HGB_LEARNING_RATE,
+            early_stopping=row_count >= ML_HGB_EARLY_STOPPING_MIN_ROWS,
+            categorical_features=_get_categorical_features(entity_count),
+            random_state=ML_RANDOM_STATE
+        )
+    
+    if ML_MODEL_TYPE == ML_MODEL_TYPE_RANDOM_FOREST:
+        return RandomForestRegressor(
+            n_estimators=ML_N_ESTIMATORS,
+            random_state=ML_RANDOM_STATE,
+            n_jobs=n_jobs,
+            max_depth=ML_MAX_DEPTH,
+            max_features=ML_MAX_FEATURES,
+            # Taille des arbres bornée quand le volume de données augmente
+            min_samples_leaf=max(
+                ML_MIN_SAMPLES_LEAF, row_count // ML_MIN_SAMPLES_LEAF_ROWS_DIVISOR
+            )
+        )
+    
+    raise ValueError(f"Type de modèle inconnu : {ML_MODEL_TYPE}")
+
+
+def train_models(
+    session_id: str,
+    data_provider: Callable[[str], pd.DataFrame] = get_all_data
+) -> ModelState:
     """
     Entraîne les modèles ML pour une session donnée.
     
     Args:
         session_id: ID de la session
+        data_provider: Fonction de chargement des données d'une session
+            (par défaut get_all_data ; injectable pour les tests)
     
     Returns:
         ModelState: Nouvel état de modèle entraîné
@@ -26,7 +130,7 @@ def train_models(session_id: str) -> ModelState:
         NoDataFoundError: Si aucune donnée n'est disponible
     """
     # Charger les données depuis la base de données de la session
-    df = get_all_data(session_id)
+    df = data_provider(session_id)
     
     if df.empty:
         raise NoDataFoundError(
@@ -36,49 +140,43 @@ def train_models(session_id: str) -> ModelState:
     # Créer un nouvel état de modèle (pas d'état global !)
     model_state = ModelState()
     
-    # 1. Encodage des IDs employés
-    all_entity_ids = df[DFCols.ID].unique()
-    model_state.id_encoder.fit(all_entity_ids)
-    df[DFCols.ID_ENCODED] = model_state.id_encoder.transform(df[DFCols.ID])
-    
-    # 2. Créer le mapping ID réel -> ID encodé
-    model_state.id_map = {
-        real_id: int(encoded_id)  # Conversion explicite en int
-        for real_id, encoded_id in zip(
-            all_entity_ids,
-            model_state.id_encoder.transform(all_entity_ids)
-        )
-    }
+    # 1. Encodage des IDs employés (un seul passage sur la colonne)
+    df[DFCols.ID_ENCODED] = model_state.id_encoder.fit_transform(df[DFCols.ID])
+    entity_count = len(model_state.id_encoder.classes_)
+    
+    # 2. Préparer les features
+    # Matrice NumPy float32 C-contiguë : aucune copie dans sklearn
+    X = build_feature_matrix(df)
     
-    # 3. Préparer les features
-    X = df[FEATURES]
-    
-    # 4. Entraîner le modèle pour les heures d'arrivée
-    y_start = df[DFCols.START_TIME_BY_MINUTES]
-    model_state.model_start_time = RandomForestRegressor(
-        n_estimators=ML_N_ESTIMATORS,
-        random_state=ML_RANDOM_STATE,
-        n_jobs=ML_N_JOBS,
-        max_depth=ML_MAX_DEPTH
-    )
-    model_state.model_start_time.fit(X, y_start)
-    
-    # 5. Entraîner le modèle pour les heures de départ
-    y_end = df[DFCols.END_TIME_BY_MINUTES]
-    model_state.model_end_time = RandomForestRegressor(
-        n_estimators=ML_N_ESTIMATORS,
-        random_state=ML_RANDOM_STATE,
-        n_jobs=ML_N_JOBS,
-        max_depth=ML_MAX_DEPTH
-    )
-    model_state.model_end_time.fit(X, y_end)
-    
-    # 6. Mettre à jour les métadonnées
-    from datetime import datetime
+    # Minutes (< 1440) : représentation float32 exacte
+    y_start = df[DFCols.START_TIME_BY_MINUTES].to_numpy(np.float32)
+    y_end = df[DFCols.END_TIME_BY_MINUTES].to_numpy(np.float32)
+    
+    if ML_MODEL_TYPE == ML_MODEL_TYPE_RANDOM_FOREST:
+        # 3. Une seule forêt multi-sorties (arrivée, départ) : les arbres
+        # sont construits une seule fois pour les deux cibles corrélées
+        model = _build_regressor(entity_count, len(df), _get_n_jobs(len(df)))
+        model.fit(X, np.column_stack([y_start, y_end]))
+        # Prédictions sur quelques lignes : pas de répartition entre threads
+        model.set_params(n_jobs=1)
+        model_state.model_start_time = model_state.model_end_time = model
+    else:
+        # 3. Créer les modèles pour les heures d'arrivée et de départ
+        n_jobs = _get_n_jobs(len(df))
+        model_state.model_start_time = _build_regressor(entity_count, len(df), n_jobs)
+        model_state.model_end_time = _build_regressor(entity_count, len(df), n_jobs)
+        
+        # 4. Entraîner les deux modèles l'un après l'autre : chaque fit HGB
+        # utilise déjà tous les cœurs (OpenMP), deux fits simultanés
+        # sur-souscriraient le processeur
+        model_state.model_start_time.fit(X, y_start)
+        model_state.model_end_time.fit(X, y_end)
+    
+    # 5. Mettre à jour les métadonnées
     model_state.is_trained = True
     model_state.trained_at = datetime.now().isoformat()
     model_state.data_row_count = len(df)
-    model_state.entity_count = len(model_state.id_map)
+    model_state.entity_count = entity_count
     
     return model_state
 
@@ -105,10 +203,23 @@ def get_model_info(model_state: ModelState) -> dict:
         'data_row_count': model_state.data_row_count,
         'entity_count': model_state.entity_count,
         'features': FEATURES,
-        'model_type': 'RandomForestRegressor',
-        'model_params': {
-            'n_estimators': ML_N_ESTIMATORS,
-            'max_depth': ML_MAX_DEPTH,
-            'random_state': ML_RANDOM_STATE
-        }
-    }
\ No newline at end of file
+        'model_type': type(model_state.model_start_time).__name__,
+        'model_params': _get_model_params(model_state.model_start_time)
+    }
+
+
+def _get_model_params(model: Any) -> dict:
+    """
+    Retourne les principaux hyperparamètres d'un modèle entraîné.
+    
+    Lus sur le modèle lui-même : reste exact pour les sessions entraînées
+    avec un autre ML_MODEL_TYPE que la configuration actuelle.
+    
+    Args:
+        model: Régresseur scikit-learn
+    
+    Returns:
+        Dictionnaire des hyperparamètres
+    """
+    params = model.get_params()
+    return {key: params[key] for key in _REPORTED_MODEL_PARAMS if key in params}
@@ -1,13 +1,16 @@
 from work_time_prediction.core.constants import (
     APP_ROOT_DIR, DATA_DIR, LOGS_DIR, CONFIG_DIR, SESSIONS_DIR, QUOTAS_DIR,
-    SESSIONS_DIR,
     SESSION_METADATA_FILE,
+    SESSION_MODEL_FILE,
     SESSION_MODEL_ARRIVAL_FILE,
     SESSION_MODEL_DEPARTURE_FILE,
     SESSION_ENCODER_FILE,
-    SESSION_DATA_DB_FILE
+    SESSION_DATA_DB_FILE,
+    SESSION_DATA_HASH_FILE
 )
 from pathlib import Path
+from typing import Iterable
+import os
 import shutil
 
 def get_session_dir(session_id: str) -> Path:
@@ -37,11 +40,20 @@ def get_session_file_path(session_id: str, filename: str) -> Path:
     return get_session_dir(session_id) / filename
 
 
+# Répertoires de l'application déjà créés dans ce processus
+_directories_ready = False
+
+
 def ensure_directories_exist():
     """
     Crée tous les répertoires nécessaires s'ils n'existent pas.
-    À appeler au démarrage de l'application.
+    À appeler au démarrage de l'application (sans effet aux appels suivants).
     """
+    global _directories_ready
+    
+    if _directories_ready:
+        return
+    
     directories = [
         APP_ROOT_DIR,
         DATA_DIR,
@@ -52,7 +64,9 @@ def ensure_directories_exist():
     ]
     
     for directory in directories:
-        directory.mkdir(parents=True, exist_ok=True)
+        os.makedirs(directory, exist_ok=True)
+    
+    _directories_ready = True
 
 
 def get_session_metadata_path(session_id: str) -> Path:
@@ -60,6 +74,11 @@ def get_session_metadata_path(session_id: str) -> Path:
     return get_session_dir(session_id) / SESSION_METADATA_FILE
 
 
+def get_session_model_path(session_id: str) -> Path:
+    """Retourne le chemin de l'artefact combiné (modèles + encodeur)."""
+    return get_session_dir(session_id) / SESSION_MODEL_FILE
+
+
 def get_session_model_arrival_path(session_id: str) -> Path:
     """Retourne le chemin du modèle d'arrivée."""
     return get_session_dir(session_id) / SESSION_MODEL_ARRIVAL_FILE
@@ -80,6 +99,11 @@ def get_session_data_db_path(session_id: str) -> Path:
     return get_session_dir(session_id) / SESSION_DATA_DB_FILE
 
 
+def get_session_data_hash_path(session_id: str) -> Path:
+    """Retourne le chemin de l'empreinte des données de session."""
+    return get_session_dir(session_id) / SESSION_DATA_HASH_FILE
+
+
 def create_session_directory(session_id: str) -> Path:
     """
     Crée le répertoire d'une session s'il n'existe pas.
@@ -105,8 +129,13 @@ def delete_session_directory(session_id: str) -> bool:
     Returns:
         True si supprimé, False si n'existait pas
     """
+    from work_time_prediction.core.database import dispose_session_data_engine
+    
     session_dir = get_session_dir(session_id)
     
+    # Fermer les connexions ouvertes sur data.db avant la suppression
+    dispose_session_data_engine(session_id)
+    
     if session_dir.exists():
         shutil.rmtree(session_dir)
         return True
@@ -142,12 +171,54 @@ def get_session_storage_size(session_id: str) -> float:
     if not session_dir.exists():
         return 0.0
     
+    return _get_directory_size_bytes(session_dir) / (1024 * 1024)  # Conversion en MB
+
+
+def _get_directory_size_bytes(path: str | os.PathLike) -> int:
+    """
+    Calcule la taille d'un répertoire et de ses sous-répertoires avec os.scandir
+    (parcours itératif, stat mis en cache par les DirEntry).
+    
+    Args:
+        path: Chemin du répertoire
+    
+    Returns:
+        Taille en bytes
+    """
     total_size = 0
-    for file_path in session_dir.rglob('*'):
-        if file_path.is_file():
-            total_size += file_path.stat().st_size
+    pending_dirs: list[str] = [os.fspath(path)]
+    while pending_dirs:
+        with os.scandir(pending_dirs.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total_size += entry.stat(follow_symlinks=False).st_size
+    return total_size
+
+
+def get_sizes_by_session_bulk(session_ids: Iterable[str]) -> dict[str, int]:
+    """
+    Calcule la taille de plusieurs sessions en un seul parcours du répertoire des sessions.
+    
+    Args:
+        session_ids: IDs des sessions à mesurer
+    
+    Returns:
+        Dictionnaire session_id -> taille en bytes (0 si le répertoire n'existe pas)
+    """
+    wanted = set(session_ids)
+    sizes = dict.fromkeys(wanted, 0)
+    
+    if not wanted or not SESSIONS_DIR.exists():
+        return sizes
+    
+    with os.scandir(SESSIONS_DIR) as entries:
+        for entry in entries:
+            if entry.name in wanted and entry.is_dir(follow_symlinks=False):
+                sizes[entry.name] = _get_directory_size_bytes(entry.path)
     
-    return total_size / (1024 * 1024)  # Conversion en MB
+    return sizes
 
 
 def list_all_session_ids() -> list[str]:
@@ -178,11 +249,10 @@ def get_total_storage_size() -> float:
         return 0.0
     
     total_size = 0
-    for session_dir in SESSIONS_DIR.iterdir():
-        if session_dir.is_dir():
-            for file_path in session_dir.rglob('*'):
-                if file_path.is_file():
-                    total_size += file_path.stat().st_size
+    with os.scandir(SESSIONS_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total_size += _get_directory_size_bytes(entry.path)
     
     return total_size / (1024 * 1024)
 
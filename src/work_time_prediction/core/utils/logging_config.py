@@ -1,10 +1,12 @@
 # src/work_time_prediction/core/utils/logging_config.py
 # Configuration centralisée du système de logging
 
+import atexit
 import logging
+import queue
 import sys
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from work_time_prediction.core.constants import APP_LOG_FILE, SECURITY_LOG_FILE, LOGS_DIR, APP_NAME
 
@@ -12,9 +14,52 @@ from work_time_prediction.core.constants import APP_LOG_FILE, SECURITY_LOG_FILE,
 # Créer le répertoire de logs
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Threads d'écriture des logs (formatage et I/O hors des requêtes),
+# avec le logger et le QueueHandler qui les alimentent
+_queue_listeners: list[tuple[logging.Logger, QueueHandler, QueueListener]] = []
+
+
+def _attach_queue_handlers(logger: logging.Logger, *handlers: logging.Handler):
+    """
+    Relie un logger à ses handlers via une file : l'appelant ne fait que
+    mettre l'enregistrement en file, un thread dédié formate et écrit.
+    
+    Args:
+        logger: Logger à configurer
+        handlers: Handlers réels (console, fichiers)
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _queue_listeners.append((logger, queue_handler, listener))
+
+
+def shutdown_logging():
+    """
+    Vide les files de logs, arrête les threads d'écriture et ferme les
+    handlers réels. Les QueueHandler sont retirés des loggers : aucun
+    enregistrement n'est plus mis dans une file que personne ne vide.
+    """
+    while _queue_listeners:
+        logger, queue_handler, listener = _queue_listeners.pop()
+        listener.stop()
+        
+        logger.removeHandler(queue_handler)
+        queue_handler.close()
+        for handler in listener.handlers:
+            handler.close()
+
 
 def setup_logging():
-    """Configure le système de logging pour l'application."""
+    """
+    Configure le système de logging pour l'application.
+    Idempotent : un second appel ne duplique pas les handlers.
+    """
+    if _queue_listeners:
+        return logging.getLogger(APP_NAME)
     
     # Format des logs
     log_format = logging.Formatter(
@@ -44,9 +89,8 @@ def setup_logging():
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(log_format)
     
-    # Ajouter les handlers
-    app_logger.addHandler(console_handler)
-    app_logger.addHandler(file_handler)
+    # Ajouter les handlers (écriture en arrière-plan)
+    _attach_queue_handlers(app_logger, console_handler, file_handler)
     
     # ========================================================================
     # Logger de sécurité (séparé)
@@ -65,8 +109,8 @@ def setup_logging():
     security_handler.setLevel(logging.INFO)
     security_handler.setFormatter(log_format)
     
-    security_logger.addHandler(security_handler)
-    security_logger.addHandler(console_handler)  # Aussi sur console
+    # Fichier uniquement : pas d'écriture console synchrone par événement
+    _attach_queue_handlers(security_logger, security_handler)
     
     # ========================================================================
     # Réduire le bruit des librairies externes
@@ -74,6 +118,8 @@ def setup_logging():
     logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
     logging.getLogger('uvicorn.error').setLevel(logging.INFO)
     
+    atexit.register(shutdown_logging)
+    
     return app_logger
 
 
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from work_time_prediction.core.constants import DFCols, FEATURES, FEATURES_DTYPE
+
 def get_week_of_month(date: pd.Timestamp | datetime) -> int:
     """
     Calcule l'indice de la semaine du mois (base 0) pour une date donnée.
@@ -18,4 +20,64 @@ def get_week_of_month(date: pd.Timestamp | datetime) -> int:
     day_of_week_first = first_day_of_month.weekday()
     week_of_month = int(np.ceil((day_of_month + day_of_week_first) / 7.0))
 
-    return week_of_month - 1
\ No newline at end of file
+    return week_of_month - 1
+
+def get_week_of_month_series(dates: pd.Series) -> np.ndarray:
+    """
+    Version vectorisée de get_week_of_month pour une colonne de dates.
+
+    Le jour de semaine du 1er du mois se déduit du jour courant :
+    (jour_semaine - (jour - 1)) mod 7, sans reconstruire de dates.
+
+    Args:
+        dates: Série pandas de type datetime64.
+
+    Returns:
+        Tableau des indices de semaine du mois (base 0).
+    """
+    day_of_month = dates.dt.day.to_numpy()
+    day_of_week = dates.dt.dayofweek.to_numpy()
+    day_of_week_first = (day_of_week - day_of_month + 1) % 7
+
+    return ((day_of_month + day_of_week_first - 1) // 7).astype(np.int8)
+
+
+def get_temporal_features(dates: pd.Series) -> pd.DataFrame:
+    """
+    Calcule toutes les features temporelles d'une colonne de dates en une fois
+    (accesseurs .dt vectorisés, types entiers compacts).
+
+    Args:
+        dates: Série pandas de type datetime64.
+
+    Returns:
+        DataFrame des features temporelles, même index que dates.
+    """
+    return pd.DataFrame(
+        {
+            DFCols.DAY_OF_WEEK: dates.dt.dayofweek.to_numpy(dtype=np.int8),
+            DFCols.WEEK_OF_MONTH: get_week_of_month_series(dates),
+            DFCols.WEEK_OF_YEAR: dates.dt.isocalendar().week.to_numpy(dtype=np.int8),
+            DFCols.MONTH: dates.dt.month.to_numpy(dtype=np.int8),
+            DFCols.DAY_OF_YEAR: dates.dt.dayofyear.to_numpy(dtype=np.int16),
+        },
+        index=dates.index
+    )
+
+
+def build_feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Construit la matrice des features (ordre de FEATURES) passée aux modèles.
+
+    Tableau C-contigu de type FEATURES_DTYPE, construit colonne par colonne :
+    scikit-learn l'utilise tel quel, sans copie supplémentaire.
+
+    Args:
+        df: DataFrame contenant les colonnes de FEATURES.
+
+    Returns:
+        Matrice (n_lignes, n_features).
+    """
+    return np.column_stack([
+        df[col].to_numpy(dtype=FEATURES_DTYPE) for col in FEATURES
+    ])
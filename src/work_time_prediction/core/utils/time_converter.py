@@ -1,17 +1,51 @@
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+# Format 'HH:MM' strict (chiffres ASCII) : conversion directe sans int()
+_HHMM_PATTERN = r"[0-9]{2}:[0-9]{2}"
+
 def time_to_minutes(time_str: str) -> float:
     """Convertit 'HH:MM' en minutes flottantes depuis minuit."""
     try:
         if pd.isna(time_str) or not isinstance(time_str, str) or len(time_str) != 5:
             return 0.0
+        # Chemin rapide : arithmétique directe sur les caractères ASCII
+        h1, h2, sep, m1, m2 = time_str
+        if sep == ':' and '0' <= h1 <= '9' and '0' <= h2 <= '9' and '0' <= m1 <= '9' and '0' <= m2 <= '9':
+            return float(
+                ((ord(h1) - 48) * 10 + ord(h2) - 48) * 60
+                + (ord(m1) - 48) * 10 + ord(m2) - 48
+            )
         H, M = map(int, time_str.split(':'))
         return float(H * 60 + M)
     except Exception:
         return 0.0
 
+def times_to_minutes(times: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de time_to_minutes pour une colonne entière.
+    Les valeurs 'HH:MM' strictes sont converties en bloc ; les autres
+    (rares) passent par time_to_minutes pour un résultat identique.
+    """
+    text = times.astype("string")
+    is_hhmm = text.str.fullmatch(_HHMM_PATTERN).fillna(False).astype(bool)
+    
+    minutes = pd.Series(0.0, index=times.index)
+    if is_hhmm.any():
+        # Une ligne de 5 octets ASCII par valeur : calcul entier en bloc
+        raw = "".join(text[is_hhmm].tolist()).encode("ascii")
+        digits = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 5).astype(np.int16) - 48
+        minutes[is_hhmm] = (
+            (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+        ).astype(float)
+    
+    others = ~is_hhmm
+    if others.any():
+        minutes[others] = times[others].map(time_to_minutes)
+    return minutes
+
 def minutes_to_time(minutes: float) -> str:
     """Convertit les minutes flottantes en 'HH:MM'."""
     if minutes <= 0:
@@ -25,5 +59,5 @@ def get_date_features(date: datetime) -> dict:
     """Extrait les caractéristiques Day_of_Week et Day_of_Year d'un objet datetime."""
     return {
         'Day_of_Week': date.weekday(),  # Lundi=0, Dimanche=6
-        'Day_of_Year': date.timetuple().tm_yday
+        'Day_of_Year': date.toordinal() - date.replace(month=1, day=1).toordinal() + 1
     }
@@ -1,9 +1,14 @@
 # src/work_time_prediction/core/utils/token_generator.py
 # Génération de tokens et identifiants sécurisés
 
+import re
 import secrets
-import hashlib
-from datetime import datetime
+
+from work_time_prediction.core.constants import SESSION_TOKEN_BYTES
+
+
+# Caractères hexadécimaux uniquement (pas de préfixe 0x, signe ni espaces)
+_HEX_PATTERN = re.compile(r'[0-9a-fA-F]+')
 
 
 def generate_secure_token(num_bytes: int = 32) -> str:
@@ -16,16 +21,8 @@ def generate_secure_token(num_bytes: int = 32) -> str:
     Returns:
         Token hexadécimal sécurisé
     """
-    # Générer des bytes aléatoires
-    random_bytes = secrets.token_bytes(num_bytes)
-
-    # Ajouter un timestamp pour garantir l'unicité
-    timestamp = str(datetime.utcnow().timestamp()).encode()
-
-    # Créer un hash SHA256
-    hash_obj = hashlib.sha256(random_bytes + timestamp)
-
-    return hash_obj.hexdigest()
+    # Bytes CSPRNG encodés directement : un hachage n'ajouterait aucune entropie
+    return secrets.token_hex(num_bytes)
 
 
 def generate_session_id() -> str:
@@ -35,7 +32,7 @@ def generate_session_id() -> str:
     Returns:
         ID de session (64 caractères hexadécimaux)
     """
-    return generate_secure_token(32)
+    return generate_secure_token(SESSION_TOKEN_BYTES)
 
 
 def generate_short_id(length: int = 16) -> str:
@@ -66,9 +63,5 @@ def verify_token_format(token: str, expected_length: int = 64) -> bool:
     if not token or len(token) != expected_length:
         return False
     
-    # Vérifier que c'est bien de l'hexadécimal
-    try:
-        int(token, 16)
-        return True
-    except ValueError:
-        return False
\ No newline at end of file
+    # Vérifier que c'est bien de l'hexadécimal (sans conversion en entier)
+    return _HEX_PATTERN.fullmatch(token) is not None
\ No newline at end of file
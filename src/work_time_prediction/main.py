@@ -1,11 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from work_time_prediction.api import router
 from work_time_prediction.core.utils.folder_manager import ensure_directories_exist
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from work_time_prediction.core.session_manager import session_manager
-from work_time_prediction.core.constants import CLEANUP_CONFIG
+from work_time_prediction.core.quota_manager import quota_manager
+from work_time_prediction.core.database import delete_old_security_logs, dispose_engines
+from work_time_prediction.core.constants import CLEANUP_CONFIG, DATE_FORMAT, ErrorMessages
 from work_time_prediction.core.utils.logging_config import get_logger
 
 logger = get_logger()
@@ -18,9 +24,29 @@ def cleanup_expired_sessions_job():
     """Tâche planifiée pour nettoyer les sessions expirées."""
     try:
         count = session_manager.cleanup_expired_sessions()
-        logger.info(f"Nettoyage automatique: {count} sessions expirées supprimées")
+        logger.info("Nettoyage automatique: %d sessions expirées supprimées", count)
+        
+        retention = timedelta(days=CLEANUP_CONFIG["log_retention_days"])
+        log_count = delete_old_security_logs(datetime.utcnow() - retention)
+        logger.info("Nettoyage automatique: %d logs de sécurité supprimés", log_count)
     except Exception as e:
-        logger.error(f"Erreur lors du nettoyage des sessions: {e}", exc_info=True)
+        logger.error("Erreur lors du nettoyage des sessions: %s", e, exc_info=True)
+
+
+def flush_request_counts_job():
+    """Tâche planifiée pour écrire en base les compteurs de requêtes en mémoire."""
+    try:
+        quota_manager.flush_request_counts()
+    except Exception as e:
+        logger.error("Erreur lors de l'écriture des compteurs de requêtes: %s", e, exc_info=True)
+
+
+def reset_quota_counters_job():
+    """Tâche planifiée pour réinitialiser les compteurs de quotas expirés."""
+    try:
+        quota_manager.reset_expired_counters()
+    except Exception as e:
+        logger.error("Erreur lors de la réinitialisation des compteurs: %s", e, exc_info=True)
 
 
 @asynccontextmanager
@@ -38,14 +64,14 @@ async def lifespan(app: FastAPI):
     logger.info("🔐 Configuration Admin")
     if admin_auth.is_dev_mode():
         logger.warning("⚠️  Mode: DÉVELOPPEMENT (token éphémère)")
-        logger.warning(f"Token admin: {admin_token}")
+        logger.warning("Token admin: %s", admin_token)
         logger.warning("⚠️  Ce token change à chaque redémarrage !")
         logger.warning("Pour la production: export ADMIN_TOKEN='your-secure-token'")
     else:
         logger.info("✅ Mode: PRODUCTION (token depuis variable d'environnement)")
-        logger.info(f"Token admin: {admin_token}")
+        logger.info("Token admin: %s", admin_token)
     
-    logger.info(f"Usage: Header 'X-Admin-Token: {admin_token}'")
+    logger.info("Usage: Header 'X-Admin-Token: %s'", admin_token)
     logger.info("Endpoints protégés: /cleanup, /cache-info, /cache-clear")
     
     # Démarrage du scheduler
@@ -56,8 +82,20 @@ async def lifespan(app: FastAPI):
         hours=cleanup_interval_hours,
         id='cleanup_sessions'
     )
+    scheduler.add_job(
+        flush_request_counts_job,
+        'interval',
+        minutes=1,
+        id='flush_request_counts'
+    )
+    scheduler.add_job(
+        reset_quota_counters_job,
+        'interval',
+        minutes=1,
+        id='reset_quota_counters'
+    )
     scheduler.start()
-    logger.info(f"✓ Scheduler démarré: nettoyage toutes les {cleanup_interval_hours}h")
+    logger.info("✓ Scheduler démarré: nettoyage toutes les %sh", cleanup_interval_hours)
     
     logger.info("=" * 70)
     logger.info("✓ Application démarrée avec succès")
@@ -68,14 +106,23 @@ async def lifespan(app: FastAPI):
     # Arrêt
     logger.info("Arrêt de l'application...")
     scheduler.shutdown()
+    flush_request_counts_job()
     logger.info("✓ Scheduler arrêté")
+    
+    session_manager.flush_pending_saves()
+    logger.info("✓ Modèles en attente écrits sur disque")
+    
+    dispose_engines()
     logger.info("✓ Application arrêtée proprement")
 
 
 # Initialisation de l'application FastAPI
 app = FastAPI(
     title="Work Time Prediction API",
-    description="API de prédiction des intervalles horaires de travail avec système de sessions."
+    description="API de prédiction des intervalles horaires de travail avec système de sessions.",
+    lifespan=lifespan,
+    # Sérialisation JSON des réponses avec orjson (déjà une dépendance)
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -97,6 +144,22 @@ logger.info("Middlewares ajoutés: CORS, Quotas")
 app.include_router(router, prefix="/api")
 logger.info("Routes enregistrées: session, train_models, predict")
 
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """
+    Conserve la réponse 400 historique pour une date cible mal formée
+    (parsée par PredictionRequest) ; les autres erreurs restent en 422.
+    """
+    for error in exc.errors():
+        if error.get("type") == "value_error" and error.get("loc", ())[-1:] == ("target_date",):
+            return ORJSONResponse(
+                status_code=400,
+                content={"detail": ErrorMessages.INVALID_DATE_FORMAT.format(DATE_FORMAT)}
+            )
+    
+    return await request_validation_exception_handler(request, exc)
+
 @app.get("/api/")
 async def root():
     """Endpoint de vérification de l'état de l'API."""
@@ -1,30 +1,76 @@
 # src/work_time_prediction/core/db_models.py
 # Modèles SQLAlchemy pour l'application
 
+import calendar
+import warnings
 from sqlalchemy import (
-    Column, String, Integer, Float, Text, DateTime, ForeignKey, Boolean, Index
+    BigInteger, CheckConstraint, Column, String, Integer, SmallInteger, Float, Text, Date,
+    DateTime, ForeignKey, Boolean, Index, UniqueConstraint, desc, select, text, tuple_, update
 )
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from work_time_prediction.core.constants import DFCols
+from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
+from datetime import datetime, timezone
+from typing import Optional
+from work_time_prediction.core.constants import (
+    DFCols, SESSION_ID_LENGTH, IP_ADDRESS_MAX_LENGTH, MINUTES_PER_DAY
+)
 Base = declarative_base()
 
 
+class EpochDateTime(TypeDecorator):
+    """
+    Datetime UTC (naïf) stocké en INTEGER (secondes depuis l'epoch).
+    
+    Comparaisons et index sur des entiers de 8 octets au lieu de chaînes
+    ISO ; côté Python la colonne reste un datetime.
+    """
+    
+    impl = Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return calendar.timegm(value.utctimetuple())
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+
+# Datetime stocké à la seconde sous SQLite, au format de CURRENT_TIMESTAMP
+# (func.now()) : les valeurs liées depuis Python (sans ".000000") restent
+# comparables lexicalement aux valeurs par défaut
+SecondsDateTime = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
+
 class Session(Base):
     """Modèle de session utilisateur."""
     
     __tablename__ = 'sessions'
     
-    session_id = Column(String, primary_key=True)
-    ip_address = Column(String, nullable=False, index=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    last_accessed = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
-    expires_at = Column(DateTime, nullable=False, index=True)
+    session_id = Column(String(SESSION_ID_LENGTH), primary_key=True)
+    ip_address = Column(String(IP_ADDRESS_MAX_LENGTH), nullable=False)  # Couvert par idx_sessions_ip_expires
+    created_at = Column(SecondsDateTime, nullable=False, default=func.now())
+    last_accessed = Column(SecondsDateTime, nullable=False, default=func.now(), index=True)
+    expires_at = Column(EpochDateTime, nullable=False, index=True)
     session_metadata = Column(Text, default='{}')
     
-    # Relations
-    security_logs = relationship("SecurityLog", back_populates="session", cascade="all, delete-orphan")
+    # Relations : jamais chargées implicitement (pas de N+1) ; utiliser
+    # selectinload(Session.security_logs) pour les parcourir
+    security_logs = relationship(
+        "SecurityLog", back_populates="session", cascade="all, delete-orphan",
+        lazy="raise", passive_deletes=True
+    )
     
     # Index composites
     __table_args__ = (
@@ -34,15 +80,27 @@ class Session(Base):
     def __repr__(self):
         return f"<Session(session_id={self.session_id}, ip={self.ip_address})>"
     
+    def is_expired_at(self, now: datetime) -> bool:
+        """Vérifie si la session est expirée à la date donnée (UTC)."""
+        return now > self.expires_at
+    
     @property
     def is_expired(self) -> bool:
-        """Vérifie si la session est expirée."""
-        return datetime.utcnow() > self.expires_at
+        """Vérifie si la session est expirée (déprécié: utiliser is_expired_at)."""
+        warnings.warn(
+            "Session.is_expired est déprécié, utiliser is_expired_at(now)",
+            DeprecationWarning, stacklevel=2
+        )
+        return self.is_expired_at(datetime.utcnow())
     
     @property
     def is_active(self) -> bool:
-        """Vérifie si la session est active."""
-        return not self.is_expired
+        """Vérifie si la session est active (déprécié: utiliser is_expired_at)."""
+        warnings.warn(
+            "Session.is_active est déprécié, utiliser not is_expired_at(now)",
+            DeprecationWarning, stacklevel=2
+        )
+        return not self.is_expired_at(datetime.utcnow())
 
 
 class IPQuota(Base):
@@ -50,29 +108,68 @@ class IPQuota(Base):
     
     __tablename__ = 'ip_quotas'
     
-    ip_address = Column(String, primary_key=True)
+    ip_address = Column(String(IP_ADDRESS_MAX_LENGTH), primary_key=True)
     models_count = Column(Integer, default=0)
     storage_used_mb = Column(Float, default=0.0)
     requests_count = Column(Integer, default=0)
     train_count = Column(Integer, default=0)
     predictions_count = Column(Integer, default=0)
     violations_count = Column(Integer, default=0)
-    is_banned = Column(Boolean, default=False, index=True)
-    banned_until = Column(DateTime, nullable=True, index=True)
-    last_reset = Column(DateTime, nullable=False, default=datetime.utcnow)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    is_banned = Column(Boolean, default=False)
+    banned_until = Column(SecondsDateTime, nullable=True)
+    last_reset = Column(SecondsDateTime, nullable=False, default=func.now())
+    created_at = Column(SecondsDateTime, nullable=False, default=func.now())
+    
+    # Index partiel : seules les IPs bannies (rares) sont indexées
+    __table_args__ = (
+        Index(
+            'idx_ip_quotas_banned_until_partial', 'banned_until',
+            sqlite_where=text('is_banned = 1'),
+            postgresql_where=text('is_banned = true')
+        ),
+    )
     
     def __repr__(self):
         return f"<IPQuota(ip={self.ip_address}, models={self.models_count}, banned={self.is_banned})>"
     
-    @property
-    def is_currently_banned(self) -> bool:
-        """Vérifie si l'IP est actuellement bannie."""
+    @classmethod
+    def bump(cls, db_session, ip_address: str, **deltas: int):
+        """
+        Incrémente atomiquement des compteurs (un seul UPDATE, sans SELECT).
+        
+        Args:
+            db_session: Session SQLAlchemy
+            ip_address: Adresse IP
+            **deltas: Incrément par colonne (ex: requests_count=1)
+        
+        Returns:
+            Résultat de l'UPDATE
+        """
+        return db_session.execute(
+            update(cls)
+            .where(cls.ip_address == ip_address)
+            .values({
+                getattr(cls, column): getattr(cls, column) + delta
+                for column, delta in deltas.items()
+            })
+        )
+    
+    def is_currently_banned_at(self, now: datetime) -> bool:
+        """Vérifie si l'IP est bannie à la date donnée (UTC)."""
         if not self.is_banned:
             return False
         if self.banned_until is None:
             return True
-        return datetime.utcnow() < self.banned_until
+        return now < self.banned_until
+    
+    @property
+    def is_currently_banned(self) -> bool:
+        """Vérifie si l'IP est actuellement bannie (déprécié: utiliser is_currently_banned_at)."""
+        warnings.warn(
+            "IPQuota.is_currently_banned est déprécié, utiliser is_currently_banned_at(now)",
+            DeprecationWarning, stacklevel=2
+        )
+        return self.is_currently_banned_at(datetime.utcnow())
 
 
 class SecurityLog(Base):
@@ -81,23 +178,60 @@ class SecurityLog(Base):
     __tablename__ = 'security_logs'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String, ForeignKey('sessions.session_id', ondelete='CASCADE'), index=True)
-    ip_address = Column(String, nullable=False, index=True)
+    session_id = Column(
+        String(SESSION_ID_LENGTH),
+        ForeignKey('sessions.session_id', ondelete='CASCADE'),
+        index=True
+    )
+    ip_address = Column(String(IP_ADDRESS_MAX_LENGTH), nullable=False)  # Couvert par idx_security_logs_ip_created_id_desc
     event_type = Column(String, nullable=False, index=True)
     event_data = Column(Text, nullable=True)
     severity = Column(String, default='INFO', index=True)  # INFO, WARNING, ERROR, CRITICAL
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    created_at = Column(SecondsDateTime, nullable=False, default=func.now(), index=True)
     
     # Relations
-    session = relationship("Session", back_populates="security_logs")
+    session = relationship("Session", back_populates="security_logs", lazy="raise")
     
-    # Index composites
+    # Index composites (ordre décroissant : événements récents d'une IP ;
+    # id départage les logs de la même seconde)
     __table_args__ = (
-        Index('idx_security_logs_ip_date', 'ip_address', 'created_at'),
+        Index('idx_security_logs_ip_created_id_desc', 'ip_address', desc('created_at'), desc('id')),
     )
     
     def __repr__(self):
         return f"<SecurityLog(id={self.id}, type={self.event_type}, severity={self.severity})>"
+    
+    @classmethod
+    def page_for_ip(
+        cls,
+        db_session,
+        ip_address: str,
+        before_ts: Optional[datetime] = None,
+        before_id: Optional[int] = None,
+        limit: int = 50
+    ) -> list:
+        """
+        Récupère une page de logs d'une IP, du plus récent au plus ancien.
+        Pagination par curseur (keyset) sur (created_at, id) : coût constant
+        quelle que soit la page, sans perte ni doublon entre logs de la même seconde.
+        
+        Args:
+            db_session: Session SQLAlchemy
+            ip_address: Adresse IP
+            before_ts: created_at du dernier log de la page précédente (None: première page)
+            before_id: id du dernier log de la page précédente
+            limit: Nombre maximal de logs
+        
+        Returns:
+            Liste de SecurityLog
+        """
+        query = select(cls).where(cls.ip_address == ip_address)
+        if before_ts is not None and before_id is not None:
+            query = query.where(tuple_(cls.created_at, cls.id) < (before_ts, before_id))
+        
+        return db_session.execute(
+            query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit)
+        ).scalars().all()
 
 
 class ScheduleData(Base):
@@ -105,14 +239,32 @@ class ScheduleData(Base):
     
     __tablename__ = 'schedule_data'
     
-    id = Column(DFCols.ID, String, primary_key=True)
-    date = Column(DFCols.DATE, String, primary_key=True)
-    start_time_by_minutes = Column(DFCols.START_TIME_BY_MINUTES, Integer, nullable=False)
-    end_time_by_minutes = Column(DFCols.END_TIME_BY_MINUTES, Integer, nullable=False)
+    # Clé de substitution (alias du rowid sous SQLite, qui n'accepte que INTEGER)
+    pk = Column(
+        BigInteger().with_variant(Integer, 'sqlite'),
+        primary_key=True, autoincrement=True
+    )
+    id = Column(DFCols.ID, String, nullable=False)
+    date = Column(DFCols.DATE, Date, nullable=False)  # Stockée en ISO (aaaa-mm-jj)
+    start_time_by_minutes = Column(DFCols.START_TIME_BY_MINUTES, SmallInteger, nullable=False)
+    end_time_by_minutes = Column(DFCols.END_TIME_BY_MINUTES, SmallInteger, nullable=False)
     
+    # Index couvrant : l'historique d'une entité est lu depuis l'index seul
     __table_args__ = (
-        Index('idx_schedule_data_id', DFCols.ID),
-        Index('idx_schedule_data_date', DFCols.DATE),
+        UniqueConstraint(DFCols.ID, DFCols.DATE, name='uq_schedule_data_id_date'),
+        Index(
+            'idx_schedule_data_id_date_covering',
+            DFCols.ID, DFCols.DATE,
+            DFCols.START_TIME_BY_MINUTES, DFCols.END_TIME_BY_MINUTES
+        ),
+        CheckConstraint(
+            f'{DFCols.START_TIME_BY_MINUTES} BETWEEN 0 AND {MINUTES_PER_DAY - 1}',
+            name='ck_start_range'
+        ),
+        CheckConstraint(
+            f'{DFCols.END_TIME_BY_MINUTES} BETWEEN 0 AND {MINUTES_PER_DAY - 1}',
+            name='ck_end_range'
+        ),
     )
     
     def __repr__(self):
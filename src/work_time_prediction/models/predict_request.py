@@ -1,11 +1,35 @@
 # Modèle Pydantic pour la requête de prédiction
 
-from pydantic import BaseModel
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic_core import PydanticCustomError
+
+from work_time_prediction.core.constants import DATE_FORMAT, ErrorMessages
 
 class PredictionRequest(BaseModel):
     """
     Définit la structure de la requête pour la prédiction des horaires.
     """
+    model_config = ConfigDict(extra='ignore')
+    
     id: str
-    target_date: str # Format attendu : jj/mm/aaaa
+    target_date: date # Format attendu : jj/mm/aaaa
     window_size: int = 31
+    
+    @field_validator("target_date", mode="before")
+    @classmethod
+    def parse_target_date(cls, value):
+        """
+        Parse la date jj/mm/aaaa une seule fois, à la validation.
+        Une chaîne mal formée produit une erreur 'value_error' renvoyée en
+        400 par le gestionnaire de main.py (contrat historique de /predict/).
+        """
+        if isinstance(value, date):
+            return value
+        if not isinstance(value, str):
+            raise PydanticCustomError('string_type', 'Input should be a valid string')
+        try:
+            return datetime.strptime(value, DATE_FORMAT).date()
+        except ValueError:
+            raise ValueError(ErrorMessages.INVALID_DATE_FORMAT.format(DATE_FORMAT))
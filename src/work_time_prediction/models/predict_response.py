@@ -1,11 +1,14 @@
 # Modèle Pydantic pour la réponse de prédiction
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from pydantic.dataclasses import dataclass
 from typing import List
 
-class PredictedDay(BaseModel):
+@dataclass(slots=True, frozen=True, config=ConfigDict(extra='ignore'))
+class PredictedDay:
     """
     Définit la structure de données pour un jour prédit ou historique.
+    Dataclass à slots : pas de __dict__ par jour de la réponse.
     """
     date: str
     weekday: str
@@ -17,4 +20,24 @@ class PredictionResponse(BaseModel):
     """
     Conteneur pour la liste des prédictions.
     """
+    model_config = ConfigDict(extra='ignore')
+    
     predictions: List[PredictedDay]
+
+
+# Validateur/sérialiseur compilé une seule fois pour la liste des jours prédits
+_PREDS_ADAPTER = TypeAdapter(List[PredictedDay])
+
+
+def dump_predictions(preds: List[dict]) -> bytes:
+    """
+    Valide et sérialise les prédictions au format JSON de PredictionResponse.
+    
+    Args:
+        preds: Liste de dictionnaires (champs de PredictedDay)
+    
+    Returns:
+        Corps JSON {"predictions": [...]}
+    """
+    predicted_days = _PREDS_ADAPTER.validate_python(preds)
+    return b'{"predictions":' + _PREDS_ADAPTER.dump_json(predicted_days) + b'}'
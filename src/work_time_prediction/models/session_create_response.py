@@ -1,8 +1,10 @@
 # src/work_time_prediction/models/session_create_response
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class SessionCreateResponse(BaseModel):
     """Réponse lors de la création d'une session."""
+    model_config = ConfigDict(extra='ignore')
+    
     session_id: str
     message: str
\ No newline at end of file
@@ -1,14 +1,18 @@
 # src/work_time_prediction/models/session_info_response.py
 
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
 
 class SessionInfoResponse(BaseModel):
     """Informations sur une session."""
+    model_config = ConfigDict(extra='ignore')
+    
     session_id: str
     ip_address: str
-    created_at: str
-    last_accessed: str
-    expires_at: str
+    created_at: datetime
+    last_accessed: datetime
+    expires_at: datetime
     is_model_trained: bool
     entity_count: int
     data_row_count: int
@@ -0,0 +1,24 @@
+# test/conftest.py
+# Fixtures partagées des tests
+
+import pandas as pd
+import pytest
+
+from work_time_prediction.core.constants import DFCols
+from work_time_prediction.core.utils.temporal_features import get_temporal_features
+
+
+def _make_schedule_data(rows: list[tuple[str, str, int, int]]) -> pd.DataFrame:
+    """Construit un DataFrame au format de get_all_data (features temporelles incluses)."""
+    df = pd.DataFrame(
+        rows,
+        columns=[DFCols.ID, DFCols.DATE, DFCols.START_TIME_BY_MINUTES, DFCols.END_TIME_BY_MINUTES]
+    )
+    df[DFCols.DATE] = pd.to_datetime(df[DFCols.DATE])
+    return pd.concat([df, get_temporal_features(df[DFCols.DATE])], axis=1)
+
+
+@pytest.fixture
+def make_schedule_data():
+    """Fabrique de DataFrames d'horaires (id, date ISO, minutes de début, minutes de fin)."""
+    return _make_schedule_data
@@ -0,0 +1,35 @@
+# test/test_predictions.py
+# Tests de la génération des prédictions (historique et modèle)
+
+from datetime import date
+
+from work_time_prediction.core.constants import DFCols
+from work_time_prediction.core.predictions import generate_predictions
+from work_time_prediction.core.train_models import train_models
+
+
+ROWS = [
+    ("EMP001", "2025-01-06", 480, 1020),
+    ("EMP001", "2025-01-07", 470, 1010),
+    ("EMP002", "2025-01-06", 465, 990),
+]
+
+
+def test_generate_predictions_mixes_history_and_model(make_schedule_data):
+    """Une date présente dans l'historique est restituée telle quelle, les autres sont prédites."""
+    df = make_schedule_data(ROWS)
+    model_state = train_models("test-session", data_provider=lambda _: df)
+
+    predictions = generate_predictions(
+        model_state,
+        "test-session",
+        "EMP001",
+        [date(2025, 1, 6), date(2025, 1, 8)],
+        history_provider=lambda _, entity_id: df[df[DFCols.ID] == entity_id]
+    )
+
+    assert [p["date"] for p in predictions] == ["06/01/2025", "08/01/2025"]
+    assert predictions[0]["historical"] is True
+    assert predictions[0]["start_time"] == "08:00"
+    assert predictions[0]["end_time"] == "17:00"
+    assert predictions[1]["historical"] is False
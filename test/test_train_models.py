@@ -0,0 +1,19 @@
+# test/test_train_models.py
+# Tests de l'entraînement des modèles sur de très petits jeux de données
+
+import pytest
+
+from work_time_prediction.core.train_models import train_models
+
+
+@pytest.mark.parametrize("rows", [
+    [("EMP001", "2025-01-06", 480, 1020)],
+    [("EMP001", "2025-01-06", 480, 1020), ("EMP002", "2025-01-07", 465, 990)],
+])
+def test_train_models_on_tiny_dataset(rows, make_schedule_data):
+    """Un CSV d'une ou deux lignes s'entraîne (pas d'échantillon de validation vide)."""
+    model_state = train_models("test-session", data_provider=lambda _: make_schedule_data(rows))
+
+    assert model_state.is_trained
+    assert model_state.data_row_count == len(rows)
+    assert model_state.entity_count == len({row[0] for row in rows})